@@ -0,0 +1,7 @@
+class ApiError(Exception):
+    """Ошибка запроса к API, которая отдаётся клиенту как JSON."""
+
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
@@ -0,0 +1,104 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.forms.models import model_to_dict
+from django.test import Client
+from django.test.utils import override_settings
+
+from api.serializers import PostSerializer
+from posts.management.utils import rolled_back
+from posts.models import Group, Post
+
+User = get_user_model()
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+def model_rows(queryset):
+    """Сериализация через экземпляры моделей — для сравнения."""
+    rows = []
+    for post in queryset.select_related('author', 'group'):
+        row = model_to_dict(post, fields=PostSerializer.fields)
+        row['author'] = post.author.username
+        row['image'] = post.image.url if post.image else None
+        row['pub_date'] = post.pub_date
+        row['edited'] = post.edited
+        rows.append(row)
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность JSON API и HTML-ленты на одних '
+        'и тех же постах (кеш страниц отключён), а также сериализацию через '
+        'values() и через экземпляры моделей. Данные создаются во временной '
+        'транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(**options)
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def measure(self, name, count, func):
+        self.queries = 0
+        with connection.execute_wrapper(self.count_query):
+            started = time.perf_counter()
+            for _ in range(count):
+                func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{name:<36} {count / elapsed:8.1f} в секунду, '
+            f'{self.queries / count:4.1f} запросов к базе'
+        )
+
+    def run(self, posts, requests, limit, **options):
+        author = User.objects.create_user(username='bench_api_author')
+        group = Group.objects.create(
+            title='Замер', slug='bench-api', description='Замер API'
+        )
+        Post.objects.bulk_create(
+            Post(author=author, group=group, text=f'Пост для замера {i}')
+            for i in range(posts)
+        )
+        client = Client()
+        self.stdout.write(f'Постов: {posts}, запросов: {requests}')
+        # DEBUG выключен, чтобы в замер не попала панель отладки.
+        with override_settings(CACHES=NO_CACHE, DEBUG=False):
+            self.measure(
+                'HTML: главная страница',
+                requests,
+                lambda: client.get('/'),
+            )
+            self.measure(
+                f'API: /api/v1/posts/?limit={limit}',
+                requests,
+                lambda: client.get('/api/v1/posts/', {'limit': limit}),
+            )
+            self.measure(
+                'API: то же, поля id,text',
+                requests,
+                lambda: client.get(
+                    '/api/v1/posts/', {'limit': limit, 'fields': 'id,text'}
+                ),
+            )
+        queryset = Post.objects.filter(author=author)[:500]
+        serializer = PostSerializer()
+        self.measure(
+            'values(): 500 постов',
+            20,
+            lambda: serializer.rows(serializer.queryset(queryset)),
+        )
+        self.measure('модели: 500 постов', 20, lambda: model_rows(queryset))
@@ -0,0 +1,8 @@
+from posts.paginators import CursorPaginator
+
+
+class ValuesCursorPaginator(CursorPaginator):
+    """Курсорная пагинация по строкам ``values()`` вместо объектов."""
+
+    def _key_of(self, obj):
+        return tuple(obj[field] for field in self.key)
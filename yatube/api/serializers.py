@@ -0,0 +1,111 @@
+"""Сериализация ресурсов API через ``values()``.
+
+Поля ресурса описаны путями ORM, поэтому список объектов читается одним
+запросом с JOIN по связям, без создания экземпляров моделей. Клиент может
+запросить только часть полей (``?fields=id,text``) — в SELECT попадут
+только они и поля ключа пагинации.
+"""
+from posts.models import Comment, Follow, Group, Post
+from posts.storage import post_images
+
+from .errors import ApiError
+
+
+def image_url(name):
+    return post_images.url(name) if name else None
+
+
+class Serializer:
+    model = None
+    # Поле ответа -> путь ORM для values().
+    fields = {}
+    # Поле ответа -> функция, преобразующая значение из базы.
+    converters = {}
+    # Поля ключа курсорной пагинации в порядке убывания.
+    key = ('pub_date', 'id')
+
+    def __init__(self, requested=None):
+        names = list(self.fields)
+        if requested:
+            names = [name for name in requested.split(',') if name]
+            unknown = set(names) - set(self.fields)
+            if unknown:
+                raise ApiError(
+                    'Неизвестные поля: {}'.format(', '.join(sorted(unknown)))
+                )
+        self.names = names
+
+    def paths(self, *extra):
+        paths = {self.fields[name] for name in self.names}
+        return sorted(paths | set(self.key) | set(extra))
+
+    def queryset(self, queryset=None, *extra):
+        """``values()`` с выбранными полями, ключом и путями ``extra``."""
+        if queryset is None:
+            queryset = self.model.objects.all()
+        return queryset.values(*self.paths(*extra))
+
+    def row(self, values):
+        result = {}
+        for name in self.names:
+            value = values[self.fields[name]]
+            converter = self.converters.get(name)
+            result[name] = value if converter is None else converter(value)
+        return result
+
+    def rows(self, values_list):
+        return [self.row(values) for values in values_list]
+
+    def get(self, **lookup):
+        """Один объект по условию или None; тоже одним запросом."""
+        values = self.queryset().filter(**lookup).first()
+        return None if values is None else self.row(values)
+
+
+class PostSerializer(Serializer):
+    model = Post
+    fields = {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'edited': 'edited',
+        'author': 'author__username',
+        'group': 'group_id',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    }
+    converters = {'image': image_url}
+
+
+class GroupSerializer(Serializer):
+    model = Group
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+        'posts_count': 'posts_count',
+    }
+    key = ('id',)
+
+
+class CommentSerializer(Serializer):
+    model = Comment
+    fields = {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }
+    key = ('created', 'id')
+
+
+class FollowSerializer(Serializer):
+    model = Follow
+    fields = {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    }
+    key = ('id',)
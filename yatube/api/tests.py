@@ -0,0 +1,197 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {i}')
+            for i in range(25)
+        )
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def send(self, client, method, url, data=None):
+        return getattr(client, method)(
+            url, json.dumps(data or {}), content_type='application/json'
+        )
+
+    def test_posts_are_listed_by_cursor_in_one_query(self):
+        url = reverse('api:posts')
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, {'limit': 10})
+        first = response.json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(first['results'][0]['id'], self.post.pk)
+        self.assertEqual(first['results'][0]['author'], 'author')
+        seen = [post['id'] for post in first['results']]
+        second = self.guest_client.get(first['next']).json()
+        seen += [post['id'] for post in second['results']]
+        self.assertEqual(len(set(seen)), 20)
+        self.assertIsNotNone(second['previous'])
+
+    def test_sparse_fieldsets(self):
+        response = self.guest_client.get(
+            reverse('api:post', kwargs={'post_id': self.post.pk}),
+            {'fields': 'id,text'},
+        )
+        self.assertEqual(
+            response.json(), {'id': self.post.pk, 'text': self.post.text}
+        )
+        response = self.guest_client.get(
+            reverse('api:posts'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_lifecycle(self):
+        response = self.send(
+            self.guest_client, 'post', reverse('api:posts'), {'text': 'Нет'}
+        )
+        self.assertEqual(response.status_code, 401)
+        response = self.send(
+            self.author_client,
+            'post',
+            reverse('api:posts'),
+            {'text': 'Новый', 'group': self.group.pk},
+        )
+        self.assertEqual(response.status_code, 201)
+        created = response.json()
+        self.assertEqual(
+            (created['text'], created['group']), ('Новый', self.group.pk)
+        )
+        url = reverse('api:post', kwargs={'post_id': created['id']})
+        response = self.send(self.reader_client, 'patch', url, {'text': 'Х'})
+        self.assertEqual(response.status_code, 403)
+        response = self.send(
+            self.author_client, 'patch', url, {'text': 'Исправлен'}
+        )
+        self.assertEqual(response.json()['text'], 'Исправлен')
+        self.assertEqual(response.json()['group'], self.group.pk)
+        self.assertEqual(self.author_client.delete(url).status_code, 204)
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+
+    def test_invalid_post_reports_field_errors(self):
+        response = self.send(
+            self.author_client, 'post', reverse('api:posts'), {'text': ''}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['detail'])
+
+    def test_groups_and_comments(self):
+        response = self.guest_client.get(reverse('api:groups'))
+        self.assertEqual(response.json()['results'][0]['slug'], 'test')
+        url = reverse('api:comments', kwargs={'post_id': self.post.pk})
+        response = self.send(
+            self.reader_client, 'post', url, {'text': 'Комментарий'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [c['text'] for c in self.guest_client.get(url).json()['results']],
+            ['Комментарий'],
+        )
+        self.assertTrue(Comment.objects.filter(author=self.reader).exists())
+
+    def test_follow_and_unfollow(self):
+        url = reverse('api:follows')
+        self.assertEqual(self.guest_client.get(url).status_code, 401)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'}
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.reader_client.get(url).json()['results'][0]['author'],
+            'author',
+        )
+        response = self.reader_client.delete(
+            reverse('api:follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_writes_use_token_from_csrf_endpoint(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        url = reverse('api:posts')
+        self.assertEqual(
+            self.send(client, 'post', url, {'text': 'Без токена'}).status_code,
+            403,
+        )
+        token = client.get(reverse('api:csrf')).json()['csrf_token']
+        response = client.post(
+            url,
+            json.dumps({'text': 'С токеном'}),
+            content_type='application/json',
+            HTTP_X_CSRFTOKEN=token,
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_non_json_patch_is_rejected(self):
+        url = reverse('api:post', kwargs={'post_id': self.post.pk})
+        response = self.author_client.patch(
+            url, 'text=Форма', content_type='application/x-www-form-urlencoded'
+        )
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).text, self.post.text
+        )
+
+    def test_batch_returns_posts_with_first_comments_in_two_queries(self):
+        posts = list(Post.objects.all()[:5])
+        for post in posts:
+            Comment.objects.bulk_create(
+                Comment(post=post, author=self.reader, text=f'К {i}')
+                for i in range(4)
+            )
+        ids = [posts[3].pk, posts[0].pk, 0]
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(
+                reverse('api:posts_batch'),
+                {'ids': ','.join(map(str, ids)), 'comments': 2},
+            )
+        data = response.json()
+        self.assertEqual([post['id'] for post in data['results']], ids[:2])
+        self.assertEqual(data['missing'], [0])
+        for result in data['results']:
+            newest = Comment.objects.filter(post_id=result['id'])[:2]
+            self.assertEqual(
+                [comment['id'] for comment in result['comments']],
+                [comment.pk for comment in newest],
+            )
+
+    def test_batch_validates_ids(self):
+        too_many = ','.join(str(pk) for pk in range(1, 102))
+        for ids in ('', 'a,b', too_many):
+            with self.subTest(ids=ids[:10]):
+                response = self.guest_client.get(
+                    reverse('api:posts_batch'), {'ids': ids}
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_method_not_allowed(self):
+        response = self.guest_client.put(reverse('api:groups'))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET')
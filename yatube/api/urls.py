@@ -0,0 +1,21 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/csrf/', views.csrf, name='csrf'),
+    path('v1/posts/', views.posts, name='posts'),
+    path('v1/posts/batch/', views.posts_batch, name='posts_batch'),
+    path('v1/posts/<int:post_id>/', views.post, name='post'),
+    path(
+        'v1/posts/<int:post_id>/comments/',
+        views.comments,
+        name='comments',
+    ),
+    path('v1/groups/', views.groups, name='groups'),
+    path('v1/groups/<slug:slug>/', views.group, name='group'),
+    path('v1/follow/', views.follows, name='follows'),
+    path('v1/follow/<str:username>/', views.follow, name='follow'),
+]
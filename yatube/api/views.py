@@ -0,0 +1,343 @@
+"""JSON API постов, групп, комментариев и подписок.
+
+Чтение идёт через сериализаторы на ``values()``, запись — через те же
+формы, что и в HTML-вьюхах, поэтому проверки и сигналы (счётчики, ленты,
+кеш страниц) работают одинаково. Авторизация — сессионная, как на сайте, и
+изменяющие запросы проверяются на CSRF: клиент входит через
+``/auth/login/``, берёт токен из ``GET /api/v1/csrf/`` (он же приходит в
+куке ``csrftoken``) и передаёт его в заголовке ``X-CSRFToken``.
+
+Тело изменяющего запроса — JSON; POST принимает ещё и поля формы с
+файлами. PATCH с формой Django не разбирает, поэтому на него и на другие
+типы тела API отвечает 415.
+"""
+import json
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db.models import OuterRef, Subquery
+from django.http import Http404, HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404
+
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post
+
+from .errors import ApiError
+from .pagination import ValuesCursorPaginator
+from .serializers import (CommentSerializer, FollowSerializer,
+                          GroupSerializer, PostSerializer)
+
+User = get_user_model()
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+FORM_CONTENT_TYPES = (
+    'application/x-www-form-urlencoded',
+    'multipart/form-data',
+)
+
+MAX_BATCH = 100
+DEFAULT_BATCH_COMMENTS = 3
+MAX_BATCH_COMMENTS = 20
+
+
+def api_view(*methods):
+    """Пропускает только методы ``methods``, ошибки отдаёт как JSON."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = JsonResponse(
+                    {'detail': 'Метод не разрешён'}, status=405
+                )
+                response['Allow'] = ', '.join(methods)
+                return response
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return JsonResponse(
+                    {'detail': error.detail}, status=error.status
+                )
+            except Http404:
+                return JsonResponse({'detail': 'Не найдено'}, status=404)
+
+        return wrapper
+
+    return decorator
+
+
+def require_user(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужна авторизация', status=401)
+
+
+def payload(request):
+    """Данные запроса: JSON-объект или поля формы с файлами у POST."""
+    if request.content_type != 'application/json':
+        if (
+            request.method == 'POST'
+            and request.content_type in FORM_CONTENT_TYPES
+        ):
+            return request.POST.dict(), request.FILES
+        raise ApiError('Ожидается тело в формате JSON', status=415)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError('Некорректный JSON')
+    if not isinstance(data, dict):
+        raise ApiError('Ожидается JSON-объект')
+    return data, None
+
+
+def validate(form):
+    if not form.is_valid():
+        raise ApiError(
+            {
+                field: [error['message'] for error in errors]
+                for field, errors in form.errors.get_json_data().items()
+            }
+        )
+
+
+def number_of(request, name, default, lowest, highest):
+    try:
+        number = int(request.GET.get(name, default))
+    except ValueError:
+        raise ApiError(f'{name} должен быть числом')
+    return min(max(number, lowest), highest)
+
+
+def limit_of(request):
+    return number_of(request, 'limit', DEFAULT_LIMIT, 1, MAX_LIMIT)
+
+
+def ids_of(request):
+    """Список id из ``?ids=1,2,3`` без повторов, в порядке запроса."""
+    ids = []
+    for value in request.GET.get('ids', '').split(','):
+        if not value:
+            continue
+        if not value.isdigit():
+            raise ApiError('ids должен быть списком id через запятую')
+        if int(value) not in ids:
+            ids.append(int(value))
+    if not ids:
+        raise ApiError('Не переданы ids')
+    if len(ids) > MAX_BATCH:
+        raise ApiError(f'Не больше {MAX_BATCH} постов за запрос')
+    return ids
+
+
+def page_url(request, **params):
+    query = request.GET.copy()
+    for name, value in params.items():
+        query[name] = value
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def cursor_list(request, serializer, queryset):
+    """Страница по курсору ``?cursor=`` в порядке убывания ключа."""
+    paginator = ValuesCursorPaginator(
+        serializer.queryset(queryset), limit_of(request), key=serializer.key
+    )
+    page = paginator.get_cursor_page(request.GET.get('cursor'))
+    return JsonResponse(
+        {
+            'results': serializer.rows(page.object_list),
+            'next': page.next_cursor
+            and page_url(request, cursor=page.next_cursor),
+            'previous': page.previous_cursor
+            and page_url(request, cursor=page.previous_cursor),
+        }
+    )
+
+
+def numbered_list(request, serializer, queryset):
+    """Страница по номеру ``?page=`` для небольших списков."""
+    paginator = Paginator(
+        serializer.queryset(queryset).order_by(*serializer.key),
+        limit_of(request),
+    )
+    page = paginator.get_page(request.GET.get('page'))
+    return JsonResponse(
+        {
+            'results': serializer.rows(page.object_list),
+            'count': paginator.count,
+            'next': page.has_next()
+            and page_url(request, page=page.next_page_number())
+            or None,
+            'previous': page.has_previous()
+            and page_url(request, page=page.previous_page_number())
+            or None,
+        }
+    )
+
+
+@api_view('GET')
+def csrf(request):
+    """CSRF-токен для изменяющих запросов; заодно ставит куку."""
+    return JsonResponse({'csrf_token': get_token(request)})
+
+
+@api_view('GET', 'POST')
+def posts(request):
+    serializer = PostSerializer(request.GET.get('fields'))
+    if request.method == 'POST':
+        require_user(request)
+        data, files = payload(request)
+        form = PostForm(data, files=files)
+        validate(form)
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+        return JsonResponse(serializer.get(pk=post.pk), status=201)
+    queryset = Post.objects.all()
+    group = request.GET.get('group')
+    if group is not None:
+        if not group.isdigit():
+            raise ApiError('group должен быть id группы')
+        queryset = queryset.filter(group_id=group)
+    author = request.GET.get('author')
+    if author is not None:
+        queryset = queryset.filter(author__username=author)
+    return cursor_list(request, serializer, queryset)
+
+
+@api_view('GET')
+def posts_batch(request):
+    """Посты ``?ids=`` с первыми ``?comments=`` комментариями каждого.
+
+    Два запроса при любом числе постов: посты с авторами и группами и
+    комментарии, отобранные коррелированным подзапросом с LIMIT на пост.
+    """
+    ids = ids_of(request)
+    per_post = number_of(
+        request, 'comments', DEFAULT_BATCH_COMMENTS, 0, MAX_BATCH_COMMENTS
+    )
+    post_serializer = PostSerializer(request.GET.get('fields'))
+    comment_serializer = CommentSerializer(request.GET.get('comment_fields'))
+    found = {
+        row['id']: row
+        for row in post_serializer.queryset(Post.objects.filter(pk__in=ids))
+    }
+    comments = {pk: [] for pk in found}
+    if found and per_post:
+        first_comments = (
+            Comment.objects.filter(post_id=OuterRef('post_id'))
+            .order_by('-created', '-id')
+            .values('id')[:per_post]
+        )
+        queryset = Comment.objects.filter(
+            post_id__in=found, id__in=Subquery(first_comments)
+        ).order_by('post_id', '-created', '-id')
+        for row in comment_serializer.queryset(queryset, 'post_id'):
+            comments[row['post_id']].append(comment_serializer.row(row))
+    results = []
+    for pk in ids:
+        if pk in found:
+            result = post_serializer.row(found[pk])
+            result['comments'] = comments[pk]
+            results.append(result)
+    return JsonResponse(
+        {
+            'results': results,
+            'missing': [pk for pk in ids if pk not in found],
+        }
+    )
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+def post(request, post_id):
+    serializer = PostSerializer(request.GET.get('fields'))
+    if request.method == 'GET':
+        result = serializer.get(pk=post_id)
+        if result is None:
+            raise Http404
+        return JsonResponse(result)
+    require_user(request)
+    instance = get_object_or_404(Post, pk=post_id)
+    if instance.author_id != request.user.pk:
+        raise ApiError('Изменять пост может только автор', status=403)
+    if request.method == 'DELETE':
+        instance.delete()
+        return HttpResponse(status=204)
+    data, _ = payload(request)
+    form = PostForm(
+        {'text': instance.text, 'group': instance.group_id, **data},
+        instance=instance,
+    )
+    validate(form)
+    form.save()
+    return JsonResponse(serializer.get(pk=post_id))
+
+
+@api_view('GET')
+def groups(request):
+    serializer = GroupSerializer(request.GET.get('fields'))
+    return numbered_list(request, serializer, Group.objects.all())
+
+
+@api_view('GET')
+def group(request, slug):
+    result = GroupSerializer(request.GET.get('fields')).get(slug=slug)
+    if result is None:
+        raise Http404
+    return JsonResponse(result)
+
+
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    serializer = CommentSerializer(request.GET.get('fields'))
+    if request.method == 'POST':
+        require_user(request)
+        post = get_object_or_404(Post, pk=post_id)
+        data, _ = payload(request)
+        form = CommentForm(data)
+        validate(form)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.save()
+        return JsonResponse(serializer.get(pk=comment.pk), status=201)
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return cursor_list(
+        request, serializer, Comment.objects.filter(post_id=post_id)
+    )
+
+
+@api_view('GET', 'POST')
+def follows(request):
+    require_user(request)
+    serializer = FollowSerializer(request.GET.get('fields'))
+    if request.method == 'POST':
+        data, _ = payload(request)
+        author = User.objects.filter(username=data.get('author')).first()
+        if author is None:
+            raise ApiError({'author': ['Пользователь не найден']})
+        if author == request.user:
+            raise ApiError({'author': ['Нельзя подписаться на себя']})
+        follow, created = Follow.objects.get_or_create(
+            user=request.user, author=author
+        )
+        if not created:
+            raise ApiError({'author': ['Вы уже подписаны']})
+        return JsonResponse(serializer.get(pk=follow.pk), status=201)
+    return numbered_list(
+        request, serializer, Follow.objects.filter(user=request.user)
+    )
+
+
+@api_view('DELETE')
+def follow(request, username):
+    require_user(request)
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    if not deleted:
+        raise Http404
+    return HttpResponse(status=204)
@@ -0,0 +1,228 @@
+"""Приложение ASGI поверх синхронного обработчика Django.
+
+Django 2.2 не умеет ни ASGI, ни асинхронных вьюх, поэтому запрос ASGI
+переводится в окружение WSGI и передаётся обычному ``WSGIHandler`` в
+ограниченном пуле из ``ASGI_THREADS`` потоков. Цикл событий сам держит
+соединения, медленные загрузки и медленных читателей, а поток пула занят
+только пока Django строит ответ. Части потоковых ответов (живая лента)
+читаются в отдельном пуле ``ASGI_STREAM_THREADS``, чтобы долгие потоки не
+отнимали потоки у страниц.
+
+Тело запроса принимается не больше ``body_limit()``: картинка размером
+``UPLOAD_MAX_BYTES`` плюс обычные поля формы. Запрос, который объявил или
+прислал больше, получает 413 без чтения остатка, а загрузка чуть больше
+лимита доходит до ``LimitedUploadHandler`` и ошибки формы.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+# Повторяющиеся заголовки склеиваются через запятую, а куки — через ';':
+# клиенты HTTP/2 присылают каждую куку отдельным заголовком
+HEADER_SEPARATORS = {'HTTP_COOKIE': '; '}
+TOO_LARGE = object()
+
+
+def body_limit():
+    return settings.UPLOAD_MAX_BYTES + (
+        settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0
+    )
+
+
+class ASGIHandler:
+    def __init__(self, threads=None, stream_threads=None):
+        self.wsgi = WSGIHandler()
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+        self.stream_executor = ThreadPoolExecutor(
+            max_workers=stream_threads or settings.ASGI_STREAM_THREADS,
+            thread_name_prefix='asgi-stream',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемое соединение {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                self.stream_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, scope, receive):
+        """Тело запроса; крупное уходит во временный файл, как загрузки.
+
+        ``None`` — клиент ушёл, ``TOO_LARGE`` — тело больше ``body_limit()``.
+        """
+        limit = body_limit()
+        for name, value in scope.get('headers', []):
+            if name.lower() == b'content-length' and value.isdigit():
+                if int(value) > limit:
+                    return TOO_LARGE
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if body.tell() > limit:
+                body.close()
+                return TOO_LARGE
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    def environ(self, scope, body):
+        """Окружение WSGI для запроса ASGI ``scope``."""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        body.seek(0, 2)
+        length = body.tell()
+        body.seek(0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            # WSGI передаёт путь байтами, прочитанными как latin-1
+            'PATH_INFO': scope['path'].encode().decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'REMOTE_ADDR': client[0],
+            'CONTENT_LENGTH': str(length),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1')
+            if name == 'content-length':
+                continue
+            if name == 'content-type':
+                key = 'CONTENT_TYPE'
+            else:
+                key = 'HTTP_' + name.upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if key in environ:
+                separator = HEADER_SEPARATORS.get(key, ',')
+                value = f'{environ[key]}{separator}{value}'
+            environ[key] = value
+        return environ
+
+    def respond(self, environ):
+        """Ответ Django; обычный ответ сразу собирается целиком."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        response = self.wsgi(environ, start_response)
+        if getattr(response, 'streaming', False):
+            return started, None, response
+        try:
+            return started, b''.join(response), None
+        finally:
+            response.close()
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(scope, receive)
+        if body is None:
+            return
+        if body is TOO_LARGE:
+            await send(
+                {
+                    'type': 'http.response.start',
+                    'status': 413,
+                    'headers': [
+                        (b'content-type', b'text/plain; charset=utf-8'),
+                    ],
+                }
+            )
+            await send(
+                {'type': 'http.response.body', 'body': b'Request too large'}
+            )
+            return
+        loop = asyncio.get_running_loop()
+        with body:
+            started, content, response = await loop.run_in_executor(
+                self.executor, self.respond, self.environ(scope, body)
+            )
+        await send(
+            {
+                'type': 'http.response.start',
+                'status': started['status'],
+                'headers': started['headers'],
+            }
+        )
+        if response is None:
+            await send({'type': 'http.response.body', 'body': content})
+            return
+        await self.stream(response, receive, send)
+
+    async def stream(self, response, receive, send):
+        """Отдаёт потоковый ответ по частям, пока клиент на связи."""
+        loop = asyncio.get_running_loop()
+        disconnected = asyncio.ensure_future(receive())
+        chunks = iter(response)
+        chunk = None
+        try:
+            while True:
+                chunk = loop.run_in_executor(
+                    self.stream_executor, next, chunks, None
+                )
+                await asyncio.wait(
+                    {chunk, disconnected},
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected.done():
+                    return
+                content = chunk.result()
+                if content is None:
+                    break
+                await send(
+                    {
+                        'type': 'http.response.body',
+                        'body': content,
+                        'more_body': True,
+                    }
+                )
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            # Генератор нельзя закрыть, пока он выполняется в другом потоке
+            if chunk is not None:
+                await asyncio.wait({chunk})
+            await loop.run_in_executor(self.stream_executor, response.close)
+
+
+def get_asgi_application():
+    """Аналог ``get_wsgi_application`` для серверов ASGI."""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def page_cache(request):
+    """Добавляет срок жизни кеша страниц и фрагментов."""
+    return {'page_cache_timeout': settings.PAGE_CACHE_TIMEOUT}
@@ -0,0 +1,174 @@
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from core.asgi import ASGIHandler
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+GROUP_SLUG = 'bench-asgi'
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+def scope_for(url):
+    path, _, query = url.partition('?')
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность страниц ленты, группы, профиля и '
+        'поста при развёртывании через WSGI (синхронные воркеры) и через '
+        'ASGI (цикл событий и пул потоков) с одинаковым числом потоков. '
+        'Доля клиентов читает ответ медленно: в WSGI это время держит '
+        'воркер, в ASGI — только соединение. Кеш страниц отключён, данные '
+        'создаются и затем удаляются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--clients', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument(
+            '--slow', type=float, default=0.25,
+            help='Доля медленных клиентов.',
+        )
+        parser.add_argument(
+            '--delay', type=float, default=0.5,
+            help='Сколько медленный клиент читает ответ, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        author = User.objects.create_user(username='bench_asgi_author')
+        try:
+            urls = self.prepare(author)
+            # DEBUG выключен, чтобы в замер не попала панель отладки.
+            with override_settings(CACHES=NO_CACHE, DEBUG=False):
+                self.stdout.write(
+                    f'Потоков: {options["threads"]}, '
+                    f'клиентов: {options["clients"]}, '
+                    f'запросов: {options["requests"]}, медленных клиентов: '
+                    f'{options["slow"]:.0%} по {options["delay"]} с'
+                )
+                self.report('WSGI', *self.wsgi(urls, **options))
+                self.report('ASGI', *self.asgi(urls, **options))
+        finally:
+            author.delete()
+            Group.objects.filter(slug=GROUP_SLUG).delete()
+
+    def prepare(self, author):
+        group = Group.objects.create(
+            title='Замер ASGI', slug=GROUP_SLUG, description='Замер'
+        )
+        Post.objects.bulk_create(
+            Post(author=author, group=group, text=f'Пост для замера {i}')
+            for i in range(200)
+        )
+        post = Post.objects.filter(author=author).first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=author, text=f'Комментарий {i}')
+            for i in range(200)
+        )
+        return [
+            '/',
+            f'/group/{group.slug}/',
+            f'/profile/{author.username}/',
+            f'/posts/{post.pk}/',
+        ]
+
+    def plan(self, urls, requests, slow, **options):
+        rng = random.Random(requests)
+        return [
+            (rng.choice(urls), rng.random() < slow) for _ in range(requests)
+        ]
+
+    def run_clients(self, plan, clients, request):
+        """Гоняет ``plan`` через ``clients`` клиентов, каждый по очереди."""
+        queue = list(reversed(plan))
+        latencies = []
+
+        async def client():
+            while queue:
+                url, is_slow = queue.pop()
+                started = time.perf_counter()
+                await request(url, is_slow)
+                latencies.append(time.perf_counter() - started)
+
+        async def main():
+            await asyncio.gather(*(client() for _ in range(clients)))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return time.perf_counter() - started, latencies
+
+    def wsgi(self, urls, threads, clients, delay, **options):
+        # Пулы адаптера не используются: нужен только перевод в окружение
+        handler = ASGIHandler(threads=1, stream_threads=1)
+        workers = ThreadPoolExecutor(max_workers=threads)
+
+        def serve(url, is_slow):
+            handler.respond(handler.environ(scope_for(url), BytesIO()))
+            # Синхронный воркер пишет ответ в сокет сам и ждёт клиента
+            if is_slow:
+                time.sleep(delay)
+
+        async def request(url, is_slow):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(workers, serve, url, is_slow)
+
+        try:
+            return self.run_clients(
+                self.plan(urls, **options), clients, request
+            )
+        finally:
+            workers.shutdown()
+
+    def asgi(self, urls, threads, clients, delay, **options):
+        handler = ASGIHandler(threads=threads, stream_threads=1)
+
+        async def request(url, is_slow):
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.body' and is_slow:
+                    await asyncio.sleep(delay)
+
+            await handler(scope_for(url), receive, send)
+
+        try:
+            return self.run_clients(
+                self.plan(urls, **options), clients, request
+            )
+        finally:
+            handler.executor.shutdown()
+            handler.stream_executor.shutdown()
+
+    def report(self, name, elapsed, latencies):
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'{name}: {len(latencies) / elapsed:7.1f} запросов в секунду, '
+            f'задержка медиана {statistics.median(latencies) * 1000:5.0f} '
+            f'мс, 95% {p95 * 1000:5.0f} мс'
+        )
@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+def build_cache(alias, location):
+    config = settings.CACHE_BACKENDS[alias]
+    backend = import_string(config['BACKEND'])
+    params = {**config, 'KEY_PREFIX': 'bench', 'TIMEOUT': None}
+    return backend(location if 'LOCATION' in config else alias, params)
+
+
+def run_worker(args):
+    alias, location, seed, requests, pages, size = args
+    cache = build_cache(alias, location)
+    rng = random.Random(seed)
+    weights = [1 / (page + 1) for page in range(pages)]
+    payload = os.urandom(size)
+    hits, timings = 0, []
+    for page in rng.choices(range(pages), weights, k=requests):
+        started = time.perf_counter()
+        if cache.get(f'page:{page}') is None:
+            cache.set(f'page:{page}', payload)
+        else:
+            hits += 1
+        timings.append(time.perf_counter() - started)
+    return hits, timings
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает доли попаданий и задержки бэкендов кеша из '
+        'settings.CACHE_BACKENDS при нагрузке из нескольких процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--pages', type=int, default=500)
+        parser.add_argument('--size', type=int, default=20000)
+        parser.add_argument(
+            'backends', nargs='*', default=list(settings.CACHE_BACKENDS)
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            location = os.path.join(directory, 'cache.sqlite3')
+            for alias in options['backends']:
+                self.run(alias, location, **options)
+
+    def run(self, alias, location, workers, requests, pages, size, **kw):
+        tasks = [
+            (alias, location, seed, requests, pages, size)
+            for seed in range(workers)
+        ]
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(run_worker, tasks)
+        hits = sum(result[0] for result in results)
+        timings = sorted(t for result in results for t in result[1])
+        p95 = timings[int(len(timings) * 0.95)]
+        self.stdout.write(
+            f'{alias:>8}: попаданий {hits / len(timings):6.1%}, '
+            f'среднее {statistics.mean(timings) * 1e6:8.1f} мкс, '
+            f'p95 {p95 * 1e6:8.1f} мкс '
+            f'({workers} процессов × {requests} запросов)'
+        )
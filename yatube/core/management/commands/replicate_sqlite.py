@@ -0,0 +1,61 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Локальная замена репликации: копирует файл SQLite базы default в '
+        'файлы реплик из DATABASE_REPLICAS через backup API. С --interval '
+        'повторяет копирование, имитируя отставание реплик.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Повторять раз в столько секунд (0 — один раз).',
+        )
+
+    def handle(self, *args, interval, **options):
+        databases = connections.databases
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не заданы (YATUBE_DB_REPLICA_URLS)')
+        aliases = ['default', *settings.DATABASE_REPLICAS]
+        if any(
+            databases[alias]['ENGINE'] != 'django.db.backends.sqlite3'
+            for alias in aliases
+        ):
+            raise CommandError('Копирование работает только для SQLite')
+        while True:
+            started = time.perf_counter()
+            self.replicate(
+                databases['default']['NAME'],
+                [
+                    databases[alias]['NAME']
+                    for alias in settings.DATABASE_REPLICAS
+                ],
+            )
+            self.stdout.write(
+                f'Реплики обновлены за '
+                f'{(time.perf_counter() - started) * 1000:.0f} мс'
+            )
+            if not interval:
+                return
+            time.sleep(interval)
+
+    def replicate(self, source, targets):
+        primary = sqlite3.connect(source)
+        try:
+            for target in targets:
+                replica = sqlite3.connect(target)
+                try:
+                    primary.backup(replica)
+                finally:
+                    replica.close()
+        finally:
+            primary.close()
@@ -0,0 +1,88 @@
+"""Чтение лент с реплик базы.
+
+Вьюхи, обёрнутые ``read_from_replica``, читают со случайной реплики из
+``settings.DATABASE_REPLICAS``; запись и все остальные вьюхи идут в
+``default``. Реплика отстаёт от основной базы не больше чем на
+``REPLICA_MAX_LAG`` секунд, поэтому после любого изменяющего запроса (POST,
+PATCH, DELETE…) браузер получает куку ``STICKY_COOKIE`` и столько же читает
+из ``default`` — автор сразу видит свой пост или комментарий.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+STICKY_COOKIE = 'read_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_replica = ContextVar('replica', default=None)
+
+
+def current():
+    """Реплика, с которой читает текущая вьюха, или None."""
+    return _replica.get()
+
+
+@contextmanager
+def primary():
+    """Внутри блока вьюха читает из ``default``, даже если шла с реплики."""
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными от основной базы
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def read_from_replica(view):
+    """Направляет чтение вьюхи на реплику, если автор ничего не менял."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or STICKY_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+        token = _replica.set(random.choice(replicas))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica.reset(token)
+
+    return wrapper
+
+
+class StickyPrimaryMiddleware:
+    """Ставит куку чтения из ``default`` после изменяющего запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                STICKY_COOKIE,
+                '1',
+                max_age=settings.REPLICA_MAX_LAG,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -9,7 +9,7 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     template = 'core/403csrf.html'
-    return render(request, template)
+    return render(request, template, status=403)
 
 
 def server_error(request):
@@ -1,5 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
+from . import search
 from .models import Comment, Follow, Group, Post
 
 
@@ -17,6 +18,18 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     list_editable = ('group',)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        ids = search.search_ids(search_term, search.MAX_RESULTS + 1)
+        if len(ids) > search.MAX_RESULTS:
+            messages.warning(
+                request,
+                f'Показаны первые {search.MAX_RESULTS} найденных постов, '
+                'уточните запрос.',
+            )
+        return queryset.filter(pk__in=ids[:search.MAX_RESULTS]), False
+
 
 admin.site.register(Comment)
 
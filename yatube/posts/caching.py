@@ -0,0 +1,127 @@
+"""Кеширование страниц лент с точной инвалидацией.
+
+Каждая закешированная страница принадлежит области (``index``,
+``group:<slug>``, ``profile:<username>``). У области есть версия, которая
+входит в ключ кеша страницы. Сигналы моделей сбрасывают версию затронутых
+областей, после чего все их страницы перестают находиться в кеше, поэтому
+срок жизни страниц можно держать большим без риска показать устаревшее.
+
+Срок жизни относится только к кешу на сервере: клиентам и прокси страница
+уходит с ``Cache-Control: no-cache, max-age=0``, иначе ``cache_page``
+разрешил бы им целый час не спрашивать сервер, и сброс версии до них бы
+не доходил. Вместо этого версия служит дешёвым ETag: на запрос с
+совпавшим ``If-None-Match`` страница отвечает ``304 Not Modified``, не
+заглядывая ни в кеш страниц, ни в базу.
+
+Реплика отстаёт не больше чем на ``REPLICA_MAX_LAG`` секунд, поэтому
+страница, собранная по ней сразу после сброса версии, могла бы не увидеть
+само изменение и закешироваться под новой версией. Сброс оставляет в кеше
+отметку на ``REPLICA_MAX_LAG`` секунд; пока она есть, промах кеша по
+области собирается из ``default``. Позже реплика уже догнала изменение,
+и её страницы кешируются и получают ETag как обычно.
+"""
+from functools import wraps
+from hashlib import md5
+from urllib.parse import quote
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.views.decorators.cache import cache_page
+
+from core import replicas
+
+
+def version_key(scope):
+    # Имена пользователей и адреса групп бывают не ASCII, а memcached
+    # принимает в ключах только печатные символы ASCII без пробелов
+    return f'pages:version:{quote(scope)}'
+
+
+def bumped_key(scope):
+    return f'pages:bumped:{quote(scope)}'
+
+
+def get_version(scopes):
+    """Возвращает общую версию областей, заводя недостающие."""
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid4().hex, None)
+        versions.update(cache.get_many(missing))
+    return '.'.join(versions.get(key, '') for key in keys)
+
+
+def invalidate(*scopes):
+    """Сбрасывает версии областей, делая их страницы недействительными."""
+    cache.delete_many([version_key(scope) for scope in scopes])
+    if settings.DATABASE_REPLICAS:
+        cache.set_many(
+            {bumped_key(scope): True for scope in scopes},
+            settings.REPLICA_MAX_LAG,
+        )
+
+
+def recently_bumped(scopes):
+    """Сбрасывалась ли версия областей за последние ``REPLICA_MAX_LAG``."""
+    return bool(cache.get_many([bumped_key(scope) for scope in scopes]))
+
+
+def page_etag(request, version):
+    """ETag страницы: версия областей, пользователь и адрес с запросом."""
+    source = f'{version}:{request.user.pk}:{request.get_full_path()}'
+    return '"{}"'.format(md5(source.encode()).hexdigest())
+
+
+def revalidate(response):
+    """Запрещает клиентам отдавать страницу без проверки на сервере."""
+    patch_cache_control(response, no_cache=True, max_age=0)
+    del response['Expires']
+    return response
+
+
+def cache_versioned(*scopes, timeout=None):
+    """Кеширует вьюху в ключе, зависящем от версий областей.
+
+    Имена областей форматируются именованными аргументами вьюхи, например
+    ``@cache_versioned('group:{slug}')``. Ответ получает ETag по тем же
+    версиям, и повторный запрос с ним получает 304. Страница зависит от
+    сессии, поэтому и 304 отдаётся с ``Vary: Cookie``: иначе общий кеш
+    спутает ответы гостю и пользователю.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            names = [scope.format(**kwargs) for scope in scopes]
+            version = get_version(names)
+            etag = page_etag(request, version)
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                # 304 повторяет ETag (RFC 7232, 4.1)
+                response['ETag'] = etag
+                patch_vary_headers(response, ('Cookie',))
+                return revalidate(response)
+            cached_view = cache_page(
+                timeout or settings.PAGE_CACHE_TIMEOUT,
+                key_prefix=f'pages.{version}',
+            )(view)
+            if replicas.current() is not None and recently_bumped(names):
+                with replicas.primary():
+                    response = cached_view(request, *args, **kwargs)
+            else:
+                response = cached_view(request, *args, **kwargs)
+            revalidate(response)
+            if response.status_code != 200:
+                return response
+            if request.method in ('GET', 'HEAD'):
+                response['ETag'] = etag
+            return response
+
+        return wrapper
+
+    return decorator
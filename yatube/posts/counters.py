@@ -0,0 +1,82 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарными ``UPDATE ... SET n = n + 1`` из сигналов, так
+что страницы показывают их без ``COUNT(*)``. Команда ``recount_counters``
+пересчитывает всё заново, если значения разошлись с данными.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+def _changes(deltas):
+    return {
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    }
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            **_changes({'posts_count': delta})
+        )
+
+
+def bump_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        **_changes({'comments_count': delta})
+    )
+
+
+def bump_user(user_id, **deltas):
+    updated = UserCounters.objects.filter(user_id=user_id).update(
+        **_changes(deltas)
+    )
+    # Недостающую строку счётчиков заводим только при росте: уменьшение
+    # приходит и из каскадного удаления самого пользователя.
+    growing = all(delta > 0 for delta in deltas.values())
+    if not updated and growing:
+        recount_users(User.objects.filter(pk=user_id))
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def recount_users(users):
+    """Пересчитывает счётчики пользователей, создавая недостающие."""
+    rows = users.annotate(
+        posts_total=_count(Post, 'author'),
+        followers_total=_count(Follow, 'author'),
+        following_total=_count(Follow, 'user'),
+    ).values_list('pk', 'posts_total', 'followers_total', 'following_total')
+    for user_id, posts, followers, following in rows:
+        UserCounters.objects.update_or_create(
+            user_id=user_id,
+            defaults={
+                'posts_count': posts,
+                'followers_count': followers,
+                'following_count': following,
+            },
+        )
+
+
+def recount():
+    """Пересчитывает все счётчики по данным."""
+    Group.objects.update(posts_count=_count(Post, 'group'))
+    Post.objects.update(comments_count=_count(Comment, 'post'))
+    recount_users(User.objects.all())
@@ -0,0 +1,194 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Каждый новый пост сразу раскладывается в ленты подписчиков автора, поэтому
+страница ``follow_index`` читается одним проходом по индексу
+``(user, pub_date)`` таблицы ``FeedEntry`` без соединения через ``Follow``.
+Длина ленты ограничена ``settings.FEED_LENGTH``.
+
+Авторы с отметкой ``UserCounters.feed_pulled`` в ленты не раскладываются:
+их посты подтягиваются при чтении и сливаются с материализованной лентой
+(гибридная схема push/pull). Отметку ставит ``rebalance``, которую
+запускает команда ``rebalance_feeds``, а не запрос подписки: перевод
+автора убирает или раскладывает посты по лентам всех подписчиков. Автор
+становится читаемым с ``FEED_FANOUT_LIMIT`` подписчиков, а раскладываемым
+снова — только ниже ``FEED_PUSH_RATIO`` от порога, чтобы автор у самого
+порога не переключался туда и обратно.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import FeedEntry, Follow, Post, UserCounters
+from .paginators import CursorPaginator, MergedCursorPaginator
+
+# Сколько id пользователей передаётся в одном условии IN: старые сборки
+# SQLite принимают не больше 999 параметров на запрос
+TRIM_BATCH = 500
+
+
+def feed_length():
+    return settings.FEED_LENGTH
+
+
+def fanout_limit():
+    return settings.FEED_FANOUT_LIMIT
+
+
+def push_limit():
+    return settings.FEED_FANOUT_LIMIT * settings.FEED_PUSH_RATIO
+
+
+def pulled_key():
+    return 'feeds:pulled'
+
+
+def pulled_authors():
+    """Множество id авторов, чьи посты читаются при запросе ленты."""
+    key = pulled_key()
+    authors = cache.get(key)
+    if authors is None:
+        authors = set(
+            UserCounters.objects.filter(feed_pulled=True).values_list(
+                'user_id', flat=True
+            )
+        )
+        cache.set(key, authors, settings.FEED_PULL_CACHE_TTL)
+    return authors
+
+
+def overflowing(user_ids, length):
+    """id пользователей, у которых в ленте больше ``length`` записей."""
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), TRIM_BATCH):
+        yield from (
+            FeedEntry.objects.filter(
+                user_id__in=user_ids[start:start + TRIM_BATCH]
+            )
+            .order_by()
+            .values('user_id')
+            .annotate(entries=Count('id'))
+            .filter(entries__gt=length)
+            .values_list('user_id', flat=True)
+        )
+
+
+def trim(user_ids):
+    """Оставляет в лентах пользователей не больше ``FEED_LENGTH`` записей."""
+    length = feed_length()
+    for user_id in list(overflowing(user_ids, length)):
+        cutoff = FeedEntry.objects.filter(user_id=user_id).values_list(
+            'pub_date', 'post_id'
+        )[length:length + 1]
+        for pub_date, post_id in cutoff:
+            FeedEntry.objects.filter(
+                user_id=user_id, pub_date__lt=pub_date
+            ).delete()
+            FeedEntry.objects.filter(
+                user_id=user_id, pub_date=pub_date, post_id__lte=post_id
+            ).delete()
+
+
+def push_post(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора."""
+    if post.author_id in pulled_authors():
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id).values_list(
+            'user_id', flat=True
+        )
+    )
+    if not follower_ids:
+        return
+    with transaction.atomic():
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+                for user_id in follower_ids
+            ],
+            ignore_conflicts=True,
+        )
+        trim(follower_ids)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if author_id in pulled_authors():
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:feed_length()]
+    with transaction.atomic():
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in posts
+            ],
+            ignore_conflicts=True,
+        )
+        trim([user_id])
+
+
+def rebalance():
+    """Переводит между push и pull авторов, вышедших за полосу порога.
+
+    Ставший читаемым автор убирается из лент, иначе его посты попали бы в
+    ленту дважды; ставший раскладываемым — раскладывается по лентам всех
+    подписчиков, иначе посты, написанные в режиме pull, пропали бы.
+    Возвращает id переведённых в pull и в push авторов.
+    """
+    pulled = list(
+        UserCounters.objects.filter(
+            feed_pulled=False, followers_count__gte=fanout_limit()
+        ).values_list('user_id', flat=True)
+    )
+    pushed = list(
+        UserCounters.objects.filter(
+            feed_pulled=True, followers_count__lt=push_limit()
+        ).values_list('user_id', flat=True)
+    )
+    for author_id in pulled:
+        with transaction.atomic():
+            UserCounters.objects.filter(user_id=author_id).update(
+                feed_pulled=True
+            )
+            FeedEntry.objects.filter(post__author_id=author_id).delete()
+        cache.delete(pulled_key())
+    for author_id in pushed:
+        with transaction.atomic():
+            UserCounters.objects.filter(user_id=author_id).update(
+                feed_pulled=False
+            )
+            # backfill сверяется с множеством читаемых авторов
+            cache.delete(pulled_key())
+            for user_id in Follow.objects.filter(
+                author_id=author_id
+            ).values_list('user_id', flat=True).iterator():
+                backfill(user_id, author_id)
+        cache.delete(pulled_key())
+    return pulled, pushed
+
+
+def drop_author(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def follow_paginator(user, per_page):
+    """Паджинатор ленты подписок: материализованная часть плюс pull."""
+    entries = user.feed_entries.select_related('post__group', 'post__author')
+    sources = [
+        (CursorPaginator(entries, per_page, key=('pub_date', 'post_id')),
+         'post'),
+    ]
+    pulled = pulled_authors().intersection(
+        user.follower.values_list('author_id', flat=True)
+    )
+    if pulled:
+        posts = Post.objects.filter(author_id__in=pulled).select_related(
+            'group', 'author'
+        )
+        sources.append((CursorPaginator(posts, per_page), None))
+    return MergedCursorPaginator(sources, per_page)
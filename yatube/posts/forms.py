@@ -1,5 +1,6 @@
 from django.forms import ModelForm
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -12,6 +13,10 @@ class PostForm(ModelForm):
         }
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['image'].validators.append(uploads.check_image)
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,128 @@
+"""Уведомления о новых постах для открытых лент.
+
+Под ASGI (``settings.LIVE_SSE``) страница ленты держит соединение
+Server-Sent Events и получает id новых постов. Синхронные воркеры WSGI
+так держать соединения не могут — каждое заняло бы воркер целиком, —
+поэтому там страница раз в ``LIVE_POLL_INTERVAL`` секунд спрашивает
+``poll`` и сразу получает ответ. Сами карточки она подгружает отдельным
+запросом только для новых постов.
+Внутри процесса новые посты разносятся через ``Broker``: ожидающие потоки
+просыпаются сразу после фиксации транзакции. Между процессами весть идёт
+через общий кеш — последний id поста лежит в ``LAST_POST_KEY``, и
+ожидающие сверяются с ним не реже раза в ``settings.LIVE_POLL_INTERVAL``.
+"""
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Post
+
+LAST_POST_KEY = 'live:last_post_id'
+FEEDS = ('index', 'follow')
+
+
+class Broker:
+    """Последний опубликованный id и потоки процесса, которые его ждут."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._last = 0
+
+    def publish(self, post_id):
+        with self._condition:
+            if post_id > self._last:
+                self._last = post_id
+                self._condition.notify_all()
+
+    def wait(self, after, timeout):
+        """Ждёт id больше ``after`` не дольше ``timeout`` секунд."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._last > after, timeout)
+            return self._last
+
+
+broker = Broker()
+
+
+def last_post_id():
+    """Последний id поста по общему кешу; при промахе — по базе."""
+    last = cache.get(LAST_POST_KEY)
+    if last is None:
+        last = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        cache.add(LAST_POST_KEY, last, None)
+    return last
+
+
+def _publish(post_id):
+    if post_id > (cache.get(LAST_POST_KEY) or 0):
+        cache.set(LAST_POST_KEY, post_id, None)
+    broker.publish(post_id)
+
+
+def publish(post_id):
+    """Объявляет новый пост после фиксации транзакции."""
+    transaction.on_commit(lambda: _publish(post_id))
+
+
+def listen(after, timeout):
+    """Последний id поста, дождавшись новее ``after`` или ``timeout``.
+
+    Сначала сверяется с общим кешем — так видны посты других процессов, —
+    затем ждёт уведомления от постов своего процесса.
+    """
+    broker.publish(last_post_id())
+    return broker.wait(after, timeout)
+
+
+def new_posts(user, feed, after):
+    """Посты ленты ``feed`` новее ``after``, от новых к старым."""
+    posts = Post.objects.filter(pk__gt=after)
+    if feed == 'follow':
+        posts = posts.filter(author__following__user=user)
+    return posts
+
+
+def new_ids(user, feed, after, latest):
+    """id постов ленты в промежутке (``after``, ``latest``]."""
+    return list(
+        new_posts(user, feed, after)
+        .filter(pk__lte=latest)
+        .values_list('pk', flat=True)[:settings.LIVE_MAX_POSTS]
+    )
+
+
+def poll(user, feed, after):
+    """Последний id поста и id новых постов ленты, не дожидаясь их."""
+    latest = last_post_id()
+    if latest <= after:
+        return after, []
+    return latest, new_ids(user, feed, after, latest)
+
+
+def stream(user, feed, after):
+    """События Server-Sent Events с id новых постов ленты.
+
+    ``id`` события — последний известный id поста: браузер вернёт его в
+    заголовке Last-Event-ID при переподключении. Пока новых постов нет,
+    раз в ``LIVE_POLL_INTERVAL`` уходит комментарий, чтобы прокси не
+    закрывали соединение; через ``LIVE_STREAM_TIMEOUT`` поток завершается
+    и браузер переподключается сам, освобождая поток сервера.
+    """
+    yield f'retry: {settings.LIVE_POLL_INTERVAL * 1000}\n\n'
+    deadline = time.monotonic() + settings.LIVE_STREAM_TIMEOUT
+    while time.monotonic() < deadline:
+        latest = listen(after, settings.LIVE_POLL_INTERVAL)
+        if latest <= after:
+            yield ': ping\n\n'
+            continue
+        ids = new_ids(user, feed, after, latest)
+        after = latest
+        if ids:
+            yield f'id: {latest}\nevent: posts\ndata: {json.dumps(ids)}\n\n'
+        else:
+            yield f'id: {latest}\n\n'
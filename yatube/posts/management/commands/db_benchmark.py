@@ -0,0 +1,162 @@
+import logging
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+from django.utils.crypto import get_random_string
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+# Название, CONN_MAX_AGE и применять ли SQLITE_PRAGMAS
+PROFILES = (
+    ('соединение на запрос, журнал по умолчанию', 0, False),
+    ('постоянные соединения', 60, False),
+    ('постоянные соединения, WAL и прагмы', 60, True),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает вьюхи постов смешанным чтением и записью из нескольких '
+        'потоков для разных настроек SQLite: новое соединение на каждый '
+        'запрос, постоянные соединения, постоянные соединения с WAL и '
+        'прагмами из SQLITE_PRAGMAS. Каждый профиль работает с копией '
+        'одной и той же временной базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--writes', type=float, default=0.2,
+            help='Доля запросов на запись.',
+        )
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        database = connections.databases['default']
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            self.stderr.write('Замер рассчитан на SQLite')
+            return
+        original = dict(database)
+        directory = tempfile.mkdtemp()
+        try:
+            template = os.path.join(directory, 'template.sqlite3')
+            with override_settings(SQLITE_PRAGMAS={}):
+                self.use_database(database, template, 0)
+                call_command('migrate', verbosity=0)
+                sessions, urls = self.prepare()
+                connections.close_all()
+            # DEBUG выключен, чтобы в замер не попала панель отладки.
+            with override_settings(CACHES=NO_CACHE, DEBUG=False):
+                for number, profile in enumerate(PROFILES):
+                    name, conn_max_age, pragmas = profile
+                    path = os.path.join(directory, f'{number}.sqlite3')
+                    shutil.copy(template, path)
+                    self.use_database(database, path, conn_max_age)
+                    overrides = {} if pragmas else {'SQLITE_PRAGMAS': {}}
+                    with override_settings(**overrides):
+                        result = self.run(sessions, urls, **options)
+                    self.report(name, *result)
+                    connections.close_all()
+        finally:
+            connections.close_all()
+            database.clear()
+            database.update(original)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def use_database(self, database, path, conn_max_age):
+        connections.close_all()
+        database['NAME'] = path
+        database['CONN_MAX_AGE'] = conn_max_age
+
+    def prepare(self):
+        users = [
+            User.objects.create_user(username=f'bench_db_{i}')
+            for i in range(10)
+        ]
+        group = Group.objects.create(
+            title='Замер базы', slug='bench-db', description='Замер'
+        )
+        Post.objects.bulk_create(
+            Post(author=users[i % 10], group=group, text=f'Пост {i}')
+            for i in range(300)
+        )
+        # bulk_create в SQLite не возвращает id созданных постов
+        posts = list(group.posts.all()[:50])
+        sessions = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            sessions.append(client.cookies['sessionid'].value)
+        reads = [
+            '/',
+            f'/group/{group.slug}/',
+            *(f'/profile/{user.username}/' for user in users),
+            *(f'/posts/{post.pk}/' for post in posts),
+        ]
+        writes = [f'/posts/{post.pk}/comment/' for post in posts]
+        return sessions, (reads, writes)
+
+    def run(self, sessions, urls, threads, requests, writes, **options):
+        reads, write_urls = urls
+        handler = WSGIHandler()
+        factory = RequestFactory()
+        rng = random.Random(requests)
+        plan = []
+        for _ in range(requests):
+            if rng.random() < writes:
+                plan.append(('post', rng.choice(write_urls)))
+            else:
+                plan.append(('get', rng.choice(reads)))
+
+        def request(method, url):
+            token = get_random_string(32)
+            cookies = f'sessionid={rng.choice(sessions)}; csrftoken={token}'
+            if method == 'get':
+                environ = factory.get(url).environ
+            else:
+                environ = factory.post(
+                    url, {'text': 'Комментарий под нагрузкой'}
+                ).environ
+            environ.update(HTTP_COOKIE=cookies, HTTP_X_CSRFTOKEN=token)
+            status = []
+            started = time.perf_counter()
+            response = handler(
+                environ, lambda code, headers: status.append(int(code[:3]))
+            )
+            response.close()
+            return time.perf_counter() - started, status[0]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(lambda item: request(*item), plan))
+        elapsed = time.perf_counter() - started
+        return elapsed, results
+
+    def report(self, name, elapsed, results):
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(status >= 500 for _, status in results)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'{name}:\n  {len(results) / elapsed:7.1f} запросов в секунду, '
+            f'медиана {statistics.median(latencies) * 1000:5.1f} мс, '
+            f'95% {p95 * 1000:6.1f} мс, ошибок {errors}'
+        )
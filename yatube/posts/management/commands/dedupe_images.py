@@ -0,0 +1,93 @@
+import posixpath
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sorl.thumbnail import delete
+
+from posts import caching, thumbnails
+from posts.models import Post
+from posts.storage import post_images
+
+CONTENT_NAME = re.compile(r'/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов со старыми именами в хранилище по '
+        'содержимому, склеивая одинаковые файлы, и удаляет картинки, на '
+        'которые не ссылается ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать, ничего не меняя.',
+        )
+
+    def handle(self, *args, dry_run, **options):
+        moved = self.move_legacy(dry_run)
+        removed = self.remove_orphans(dry_run)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Перенесено картинок: {moved}, удалено лишних: {removed}'
+            )
+        )
+
+    def referenced(self):
+        return (
+            Post.objects.exclude(image='')
+            .exclude(image__isnull=True)
+            .order_by()
+            .values_list('image', flat=True)
+            .distinct()
+        )
+
+    def move_legacy(self, dry_run):
+        moved = 0
+        for name in list(self.referenced()):
+            if CONTENT_NAME.search(name) or not post_images.exists(name):
+                continue
+            moved += 1
+            if dry_run:
+                continue
+            with post_images.open(name) as file:
+                new_name = post_images.save(name, file)
+            with transaction.atomic():
+                posts = Post.objects.filter(image=name)
+                scopes = {'index'}
+                for username, slug in posts.values_list(
+                    'author__username', 'group__slug'
+                ):
+                    scopes.add(f'profile:{username}')
+                    if slug:
+                        scopes.add(f'group:{slug}')
+                posts.update(image=new_name)
+            caching.invalidate(*scopes)
+            thumbnails.generate(new_name)
+            delete(thumbnails.source(name))
+        return moved
+
+    def stored(self, directory):
+        directories, files = post_images.listdir(directory)
+        for file in files:
+            yield posixpath.join(directory, file)
+        for subdirectory in directories:
+            yield from self.stored(posixpath.join(directory, subdirectory))
+
+    def remove_orphans(self, dry_run):
+        directory = Post._meta.get_field('image').upload_to.rstrip('/')
+        if not post_images.exists(directory):
+            return 0
+        referenced = set(self.referenced())
+        removed = 0
+        for name in self.stored(directory):
+            # Файл только что загруженного поста может попасть на диск
+            # раньше, чем зафиксирована транзакция с самим постом
+            if name in referenced or post_images.is_recent(name):
+                continue
+            removed += 1
+            if not dry_run:
+                delete(thumbnails.source(name))
+        return removed
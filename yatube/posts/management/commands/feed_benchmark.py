@@ -0,0 +1,85 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from posts import counters, feeds
+from posts.management.utils import rolled_back
+from posts.models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает ленту подписок с чистым fan-out и гибридную схему '
+        'push/pull: усиление записи и время чтения. Все данные создаются '
+        'во временной транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=2000)
+        parser.add_argument('--authors', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20)
+        parser.add_argument('--reads', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(**options)
+
+    def run(self, followers, authors, posts, reads, **options):
+        star = User.objects.create_user(username='bench_star')
+        User.objects.bulk_create(
+            User(username=f'bench_author_{i}') for i in range(authors)
+        )
+        regular = list(User.objects.filter(username__startswith='bench_a'))
+        User.objects.bulk_create(
+            User(username=f'bench_reader_{i}') for i in range(followers)
+        )
+        readers = list(User.objects.filter(username__startswith='bench_r'))
+        rng = random.Random(0)
+        follows = []
+        for reader in readers:
+            follows.append(Follow(user=reader, author=star))
+            follows.extend(
+                Follow(user=reader, author=author)
+                for author in rng.sample(regular, min(3, len(regular)))
+            )
+        Follow.objects.bulk_create(follows)
+        counters.recount_users(
+            User.objects.filter(pk__in=[star.pk, *(a.pk for a in regular)])
+        )
+
+        modes = (
+            ('push', followers + 1),
+            ('hybrid', max(followers // 2, 1)),
+        )
+        for name, limit in modes:
+            with override_settings(FEED_FANOUT_LIMIT=limit):
+                feeds.rebalance()
+                FeedEntry.objects.all().delete()
+                Post.objects.filter(author__in=[star, *regular]).delete()
+                started = time.perf_counter()
+                for i in range(posts):
+                    Post.objects.create(author=star, text=str(i))
+                    Post.objects.create(
+                        author=rng.choice(regular), text=str(i)
+                    )
+                write_time = time.perf_counter() - started
+                rows = FeedEntry.objects.count()
+
+                sample = rng.sample(readers, min(reads, len(readers)))
+                started = time.perf_counter()
+                for reader in sample:
+                    paginator = feeds.follow_paginator(reader, 10)
+                    len(paginator.get_cursor_page())
+                read_time = time.perf_counter() - started
+
+            self.stdout.write(
+                f'{name:>6}: '
+                f'строк ленты на пост {rows / (2 * posts):8.1f}, '
+                f'запись {write_time / (2 * posts) * 1000:7.2f} мс/пост, '
+                f'чтение {read_time / len(sample) * 1000:7.2f} мс/страница'
+            )
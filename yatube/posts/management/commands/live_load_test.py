@@ -0,0 +1,141 @@
+import logging
+import resource
+import selectors
+import socket
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer,
+    WSGIRequestHandler,
+)
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from posts import live
+from posts.models import Post
+
+User = get_user_model()
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def rss():
+    """Текущий размер памяти процесса в КБ (только Linux)."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def raise_open_files_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        limit = needed if hard == resource.RLIM_INFINITY else hard
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, limit), hard))
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочная проверка потока событий живой ленты (LIVE_SSE): '
+        'поднимает встроенный WSGI-сервер с потоком на соединение — так '
+        'ведёт себя пул ASGI, синхронные воркеры WSGI столько соединений '
+        'не удержат, — открывает заданное число подписчиков '
+        'на /live/, публикует пост и меряет время подключения, задержку '
+        'доставки события всем подписчикам и память на соединение. '
+        'Созданный пост удаляется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--connections', type=int, nargs='+', default=[10, 100, 500]
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, connections, timeout, **options):
+        logging.getLogger('django.server').setLevel(logging.ERROR)
+        raise_open_files_limit(max(connections) * 2 + 100)
+        self.author, _ = User.objects.get_or_create(
+            username='live_load_test'
+        )
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        server.set_app(get_wsgi_application())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        # DEBUG выключен, чтобы в замер не попала панель отладки.
+        with override_settings(
+            DEBUG=False, LIVE_SSE=True, LIVE_STREAM_TIMEOUT=600
+        ):
+            try:
+                for count in connections:
+                    self.run(server.server_address[1], count, timeout)
+            finally:
+                server.shutdown()
+                server.server_close()
+                self.author.delete()
+
+    def connect(self, port, after):
+        client = socket.create_connection(('127.0.0.1', port))
+        client.sendall(
+            f'GET /live/?after={after} HTTP/1.1\r\n'
+            'Host: localhost\r\nAccept: text/event-stream\r\n\r\n'.encode()
+        )
+        received = b''
+        while b'retry:' not in received:
+            chunk = client.recv(4096)
+            if not chunk:
+                raise OSError('Сервер закрыл соединение')
+            received += chunk
+        client.setblocking(False)
+        return client
+
+    def run(self, port, count, timeout):
+        after = live.last_post_id()
+        memory = rss()
+        started = time.perf_counter()
+        clients = [self.connect(port, after) for _ in range(count)]
+        connected = time.perf_counter() - started
+        per_connection = (rss() - memory) / count
+
+        selector = selectors.DefaultSelector()
+        for client in clients:
+            selector.register(client, selectors.EVENT_READ, bytearray())
+        post = Post.objects.create(author=self.author, text='Замер ленты')
+        published = time.perf_counter()
+        delays = []
+        deadline = published + timeout
+        while len(delays) < count and time.perf_counter() < deadline:
+            for key, _ in selector.select(timeout=1):
+                chunk = key.fileobj.recv(4096)
+                key.data.extend(chunk)
+                if not chunk or b'event: posts' in key.data:
+                    selector.unregister(key.fileobj)
+                    if chunk:
+                        delays.append(time.perf_counter() - published)
+        selector.close()
+        for client in clients:
+            client.close()
+        post.delete()
+
+        delays.sort()
+        line = (
+            f'{count:>5} соединений: подключение {connected:6.2f} с, '
+            f'память {per_connection:6.1f} КБ на соединение, '
+            f'доставлено {len(delays)}/{count}'
+        )
+        if delays:
+            median = delays[len(delays) // 2]
+            line += (
+                f', задержка медиана {median * 1000:.0f} мс, '
+                f'максимум {delays[-1] * 1000:.0f} мс'
+            )
+        self.stdout.write(line)
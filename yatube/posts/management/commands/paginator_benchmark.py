@@ -0,0 +1,104 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection
+from django.template import engines
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from posts.management.utils import rolled_back
+from posts.models import Post
+from posts.paginators import CachedCountPaginator
+
+User = get_user_model()
+
+# Нумерованная часть includes/paginator.html до окна номеров страниц
+FULL_PAGE_RANGE = '''
+{% for i in page_obj.paginator.page_range %}
+  {% if page_obj.number == i %}
+    <li class="page-item active"><span class="page-link">{{ i }}</span></li>
+  {% else %}
+    <li class="page-item">
+      <a class="page-link" href="?{{ page_query }}page={{ i }}">{{ i }}</a>
+    </li>
+  {% endif %}
+{% endfor %}
+<a href="?page={{ page_obj.paginator.num_pages }}">Последняя</a>
+'''
+
+
+def window(context):
+    return render_to_string('includes/paginator.html', context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет, сколько стоит пагинатор нумерованной ленты на большой '
+        'таблице: COUNT(*) и все номера страниц против кешированного или '
+        'оценённого числа записей и окна номеров. Посты создаются во '
+        'временной транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.run(**options)
+
+    def fill(self, posts):
+        author = User.objects.create_user(username='bench_pages_author')
+        now = timezone.now()
+        batch = 20_000
+        for start in range(0, posts, batch):
+            Post.objects.bulk_create(
+                Post(author=author, text=f'Пост {i}', pub_date=now)
+                for i in range(start, min(start + batch, posts))
+            )
+
+    def measure(self, name, repeat, paginator_class, template, cold=True):
+        queryset = Post.objects.select_related('group', 'author')
+        timings = []
+        for _ in range(repeat):
+            if cold:
+                cache.clear()
+            started = time.perf_counter()
+            paginator = paginator_class(queryset, 10)
+            page = paginator.get_page(paginator.num_pages // 2)
+            html = template({'page_obj': page})
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(
+            f'{name:<44} {min(timings) * 1000:8.1f} мс, '
+            f'{len(html) // 1024:5d} КБ разметки'
+        )
+
+    def run(self, posts, repeat, **options):
+        started = time.perf_counter()
+        self.fill(posts)
+        self.stdout.write(
+            f'Постов: {Post.objects.count()}, созданы за '
+            f'{time.perf_counter() - started:.0f} с; '
+            f'середина ленты, лучшее из {repeat}'
+        )
+        full_range = engines['django'].from_string(FULL_PAGE_RANGE).render
+        self.measure(
+            'Paginator: COUNT(*) и все номера', repeat, Paginator, full_range
+        )
+        self.measure(
+            'CachedCountPaginator: COUNT(*) и окно', repeat,
+            CachedCountPaginator, window,
+        )
+        self.measure(
+            'CachedCountPaginator: число из кеша и окно', repeat,
+            CachedCountPaginator, window, cold=False,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.measure(
+            'CachedCountPaginator: оценка по статистике', repeat,
+            CachedCountPaginator, window,
+        )
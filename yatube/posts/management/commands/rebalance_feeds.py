@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Переводит авторов между раскладкой постов по лентам и чтением при '
+        'запросе ленты по числу подписчиков. Запускается по расписанию.'
+    )
+
+    def handle(self, *args, **options):
+        pulled, pushed = feeds.rebalance()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Читаются при запросе: +{len(pulled)}, '
+                f'снова в лентах: +{len(pushed)}'
+            )
+        )
@@ -0,0 +1,418 @@
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts import feeds, search
+from posts.models import (
+    Comment, FeedEntry, Follow, Group, Post, UserCounters,
+)
+
+User = get_user_model()
+
+WORDS = (
+    'и в не на я что тот быть с он а весь это как она по но они к у ты из '
+    'мы за вы так же от сказать этот который мочь человек о один ещё бы '
+    'такой только себя свой какой когда уже для вот кто да говорить год '
+    'знать день там город дом утро море лес дорога книга кот собака '
+    'весна лето осень зима поезд музыка фильм друг работа история'
+).split()
+# Доля постов без сообщества
+NO_GROUP_SHARE = 0.3
+# Сколько раз добирать подписки по степенному закону, прежде чем
+# досыпать недостающих авторов равномерно из хвоста
+DISTINCT_ATTEMPTS = 10
+
+# Последние FEED_LENGTH постов авторов, на которых подписан пользователь,
+# кроме читаемых при запросе ленты (FEED_FANOUT_LIMIT подписчиков и больше)
+FEED_SQL = '''
+INSERT INTO {feed} (user_id, post_id, pub_date)
+SELECT user_id, post_id, pub_date FROM (
+    SELECT follow.user_id, post.id AS post_id, post.pub_date,
+        ROW_NUMBER() OVER (
+            PARTITION BY follow.user_id
+            ORDER BY post.pub_date DESC, post.id DESC
+        ) AS position
+    FROM {follow} follow
+    JOIN {counters} counters ON counters.user_id = follow.author_id
+    JOIN {post} post ON post.author_id = follow.author_id
+    WHERE follow.user_id BETWEEN %s AND %s
+        AND NOT counters.feed_pulled
+) ranked
+WHERE position <= %s
+'''
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now и auto_now_add, чтобы сохранить заданные даты."""
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class PowerLaw:
+    """Выбор элементов с вероятностью, убывающей как ``1 / rank ** alpha``.
+
+    Ранги раздаются элементам в случайном порядке, поэтому популярность
+    не связана с id и датой создания.
+    """
+
+    def __init__(self, population, alpha, rng):
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.cum_weights = list(
+            accumulate(
+                rank ** -alpha for rank in range(1, len(self.population) + 1)
+            )
+        )
+        self.rng = rng
+
+    def sample(self, k):
+        return self.rng.choices(
+            self.population, cum_weights=self.cum_weights, k=k
+        )
+
+    def counts(self, k, batch):
+        """Сколько раз выпал каждый элемент за ``k`` выборов."""
+        counts = Counter()
+        if not self.population:
+            return counts
+        for start in range(0, k, batch):
+            counts.update(self.sample(min(batch, k - start)))
+        return counts
+
+    def distinct(self, k, exclude):
+        """``k`` разных элементов, кроме ``exclude``."""
+        # dict, а не set: порядок не зависит от значений id, и с тем же
+        # зерном выбор повторяется
+        chosen = {}
+        for _ in range(DISTINCT_ATTEMPTS):
+            for item in self.sample(2 * (k - len(chosen))):
+                if item != exclude:
+                    chosen[item] = None
+                    if len(chosen) == k:
+                        return list(chosen)
+        rest = [
+            item for item in self.population
+            if item not in chosen and item != exclude
+        ]
+        return [*chosen, *self.rng.sample(rest, k - len(chosen))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу данными для нагрузочных замеров: пользователи, '
+        'сообщества, посты, комментарии и подписки с популярностью по '
+        'степенному закону. Строки вставляются bulk_create пачками, каждая '
+        'в своей транзакции; счётчики, ленты подписок и поисковый индекс '
+        'строятся следом. С одинаковым --seed набор повторяется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--comments', type=int, default=300_000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=200_000,
+            help=(
+                'Сколько подписок разыграть; самым активным читателям '
+                'выпадает больше, чем есть авторов, поэтому создаётся меньше.'
+            ),
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=1.0,
+            help='Показатель степенного закона популярности (0 — равномерно).',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней разбросаны даты постов.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch', type=int, default=10_000)
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Начало имён пользователей и адресов сообществ.',
+        )
+        parser.add_argument(
+            '--password',
+            help='Общий пароль пользователей; без него войти нельзя.',
+        )
+        parser.add_argument(
+            '--no-search',
+            action='store_true',
+            help='Не перестраивать поисковый индекс.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь')
+        prefix = options['prefix']
+        if (
+            User.objects.filter(username__startswith=f'{prefix}_').exists()
+            or Group.objects.filter(slug__startswith=f'{prefix}-').exists()
+        ):
+            raise CommandError(
+                f'Данные с префиксом «{prefix}» уже есть, задайте другой '
+                f'--prefix'
+            )
+        self.rng = random.Random(options['seed'])
+        self.words = PowerLaw(WORDS, 1.0, self.rng)
+        self.batch = options['batch']
+        self.now = timezone.now()
+        started = time.perf_counter()
+        # С DEBUG каждый из миллионов запросов ещё и записывался бы в лог
+        with override_settings(DEBUG=False):
+            self.seed(options)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.0f} с'
+        ))
+
+    def seed(self, options):
+        users = self.step('Пользователи', self.create_users, options)
+        groups = self.step('Сообщества', self.create_groups, options)
+        posts = self.step(
+            'Посты и комментарии', self.create_posts, options, users, groups
+        )
+        follows = self.step('Подписки', self.create_follows, options, users)
+        self.step(
+            'Счётчики', self.create_counters, users, groups, posts, follows
+        )
+        self.step('Ленты подписок', self.fill_feeds, users)
+        if not options['no_search']:
+            self.step('Поисковый индекс', self.rebuild_search)
+        cache.clear()
+        self.stdout.write(
+            f'Пользователей {len(users)}, сообществ {len(groups)}, '
+            f'постов {sum(posts["authors"].values())}, '
+            f'комментариев {sum(posts["comments"].values())}, '
+            f'подписок {sum(follows["following"].values())}, '
+            f'записей лент {FeedEntry.objects.count()}'
+        )
+
+    def step(self, name, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        self.stdout.write(f'{name}: {time.perf_counter() - started:.1f} с')
+        return result
+
+    def inserted(self, model, after):
+        """id строк, вставленных после ``after``, по порядку вставки.
+
+        ``bulk_create`` на SQLite не возвращает первичные ключи.
+        """
+        return list(
+            model.objects.filter(pk__gt=after)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+    def last_pk(self, model):
+        last = model.objects.order_by('-pk').values_list('pk', flat=True)
+        return last.first() or 0
+
+    def create_users(self, options):
+        prefix, total = options['prefix'], options['users']
+        password = make_password(options['password'])
+        after = self.last_pk(User)
+        for start in range(0, total, self.batch):
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    User(
+                        username=f'{prefix}_{i}',
+                        password=password,
+                        date_joined=self.now,
+                    )
+                    for i in range(start, min(start + self.batch, total))
+                )
+        return self.inserted(User, after)
+
+    def create_groups(self, options):
+        prefix = options['prefix']
+        after = self.last_pk(Group)
+        with transaction.atomic():
+            Group.objects.bulk_create(
+                Group(
+                    title=f'Сообщество {i}',
+                    slug=f'{prefix}-{i}',
+                    description=self.text(5, 30),
+                )
+                for i in range(options['groups'])
+            )
+        return self.inserted(Group, after)
+
+    def text(self, shortest, longest):
+        return ' '.join(
+            self.words.sample(self.rng.randint(shortest, longest))
+        ).capitalize()
+
+    def create_posts(self, options, users, groups):
+        """Создаёт посты пачками, а следом комментарии к каждой пачке.
+
+        Возвращает число постов по авторам и группам и число комментариев
+        по постам для счётчиков.
+        """
+        total, alpha = options['posts'], options['alpha']
+        authors = PowerLaw(users, alpha, self.rng)
+        communities = PowerLaw(groups, alpha, self.rng)
+        # Число комментариев разыгрывается заранее по номерам постов
+        comments = PowerLaw(range(total), alpha, self.rng).counts(
+            options['comments'], self.batch
+        )
+        period = timedelta(days=options['days']).total_seconds()
+        date_fields = [
+            Post._meta.get_field('pub_date'),
+            Post._meta.get_field('edited'),
+            Comment._meta.get_field('created'),
+        ]
+        result = {
+            'authors': Counter(),
+            'groups': Counter(),
+            'comments': Counter(),
+        }
+        for start in range(0, total, self.batch):
+            size = min(self.batch, total - start)
+            dates = [
+                self.now - timedelta(seconds=self.rng.uniform(0, period))
+                for _ in range(size)
+            ]
+            batch = [
+                Post(
+                    author_id=author_id,
+                    group_id=(
+                        None
+                        if not groups or self.rng.random() < NO_GROUP_SHARE
+                        else communities.sample(1)[0]
+                    ),
+                    text=self.text(3, 60),
+                    pub_date=dates[i],
+                    edited=dates[i],
+                    comments_count=comments[start + i],
+                )
+                for i, author_id in enumerate(authors.sample(size))
+            ]
+            with transaction.atomic(), explicit_dates(*date_fields):
+                after = self.last_pk(Post)
+                Post.objects.bulk_create(batch)
+                post_ids = self.inserted(Post, after)
+                batch_comments = []
+                for post_id, post in zip(post_ids, batch):
+                    result['authors'][post.author_id] += 1
+                    if post.group_id is not None:
+                        result['groups'][post.group_id] += 1
+                    if post.comments_count:
+                        result['comments'][post_id] = post.comments_count
+                    age = (self.now - post.pub_date).total_seconds()
+                    batch_comments.extend(
+                        Comment(
+                            post_id=post_id,
+                            author_id=author_id,
+                            text=self.text(1, 20),
+                            created=post.pub_date + timedelta(
+                                seconds=self.rng.uniform(0, age)
+                            ),
+                        )
+                        for author_id in authors.sample(post.comments_count)
+                    )
+                Comment.objects.bulk_create(batch_comments)
+        return result
+
+    def create_follows(self, options, users):
+        """Подписки: и число подписок читателя, и популярность автора
+        распределены по степенному закону."""
+        alpha = options['alpha']
+        authors = PowerLaw(users, alpha, self.rng)
+        readers = PowerLaw(users, alpha, self.rng).counts(
+            options['follows'], self.batch
+        )
+        result = {'followers': Counter(), 'following': Counter()}
+        batch = []
+        for user_id in users:
+            wanted = min(readers[user_id], len(users) - 1)
+            if not wanted:
+                continue
+            for author_id in authors.distinct(wanted, exclude=user_id):
+                batch.append(Follow(user_id=user_id, author_id=author_id))
+                result['followers'][author_id] += 1
+            result['following'][user_id] += wanted
+            if len(batch) >= self.batch:
+                with transaction.atomic():
+                    Follow.objects.bulk_create(batch)
+                batch = []
+        with transaction.atomic():
+            Follow.objects.bulk_create(batch)
+        return result
+
+    def create_counters(self, users, groups, posts, follows):
+        """Сигналы на bulk_create не срабатывают, счётчики заводятся здесь.
+
+        Числа комментариев лежат в самих постах с момента вставки.
+        """
+        for start in range(0, len(users), self.batch):
+            with transaction.atomic():
+                UserCounters.objects.bulk_create(
+                    UserCounters(
+                        user_id=user_id,
+                        posts_count=posts['authors'][user_id],
+                        followers_count=follows['followers'][user_id],
+                        following_count=follows['following'][user_id],
+                        feed_pulled=(
+                            follows['followers'][user_id]
+                            >= feeds.fanout_limit()
+                        ),
+                    )
+                    for user_id in users[start:start + self.batch]
+                )
+        with transaction.atomic():
+            for group_id in groups:
+                Group.objects.filter(pk=group_id).update(
+                    posts_count=posts['groups'][group_id]
+                )
+
+    def rebuild_search(self):
+        with transaction.atomic():
+            search.rebuild()
+
+    def fill_feeds(self, users):
+        """Раскладывает посты в ленты подписчиков одним INSERT … SELECT
+        на пачку читателей вместо fan-out по каждому посту."""
+        sql = FEED_SQL.format(
+            feed=FeedEntry._meta.db_table,
+            follow=Follow._meta.db_table,
+            counters=UserCounters._meta.db_table,
+            post=Post._meta.db_table,
+        )
+        for start in range(0, len(users), self.batch):
+            chunk = users[start:start + self.batch]
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    sql,
+                    [
+                        chunk[0],
+                        chunk[-1],
+                        feeds.feed_length(),
+                    ],
+                )
@@ -0,0 +1,130 @@
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import get_context
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.client import BOUNDARY, encode_multipart
+from django.test.utils import override_settings
+from PIL import Image
+
+from posts import thumbnails, uploads
+from posts.forms import PostForm
+
+DJANGO_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Как принимались картинки раньше: файл целиком в памяти и полное
+# декодирование в процессе веб-сервера, — и как сейчас.
+SCENARIOS = {
+    'память, полное декодирование': (
+        {
+            'FILE_UPLOAD_HANDLERS': DJANGO_HANDLERS,
+            'FILE_UPLOAD_MAX_MEMORY_SIZE': 2621440,
+        },
+        True,
+    ),
+    'поток на диск, полное декодирование': ({}, True),
+    'поток на диск, только заголовок': ({}, False),
+}
+
+
+def reset_peak_rss():
+    """Сбрасывает пик памяти процесса до текущего (только Linux)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss():
+    """Пиковый размер памяти процесса в КБ.
+
+    ru_maxrss наследуется дочерним процессом от родителя, поэтому на Linux
+    читается VmHWM, который сбрасывается ``reset_peak_rss``.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(path, overrides, decode):
+    with open(path, 'rb') as payload:
+        body = payload.read()
+    with override_settings(**overrides):
+        reset_peak_rss()
+        before = peak_rss()
+        started = time.perf_counter()
+        request = RequestFactory().post(
+            '/create/',
+            body,
+            content_type=f'multipart/form-data; boundary={BOUNDARY}',
+        )
+        form = PostForm(request.POST, files=request.FILES)
+        valid = form.is_valid()
+        upload = request.FILES['image']
+        if decode and not isinstance(upload, uploads.RejectedUpload):
+            with Image.open(upload) as image:
+                image.load()
+        elapsed = time.perf_counter() - started
+    return valid, peak_rss() - before, elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пиковое потребление памяти при приёме большой картинки: '
+        'загрузка в память с полным декодированием против потоковой записи '
+        'на диск с проверкой только заголовка. Каждый сценарий выполняется '
+        'в отдельном процессе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=4000)
+        parser.add_argument('--height', type=int, default=3000)
+
+    def handle(self, *args, width, height, **options):
+        buffer = BytesIO()
+        Image.effect_noise((width, height), 60).convert('RGB').save(
+            buffer, 'JPEG', quality=90
+        )
+        image = SimpleUploadedFile(
+            'bench.jpg', buffer.getvalue(), 'image/jpeg'
+        )
+        body = encode_multipart(BOUNDARY, {'text': 'Замер', 'image': image})
+        size = len(buffer.getvalue())
+        self.stdout.write(
+            f'Картинка {width}×{height}, {size / 2 ** 20:.1f} МБ на входе, '
+            f'{width * height * 3 / 2 ** 20:.0f} МБ пикселей'
+        )
+        with tempfile.NamedTemporaryFile(delete=False) as payload:
+            payload.write(body)
+        try:
+            for name, (overrides, decode) in SCENARIOS.items():
+                with ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=get_context('spawn'),
+                    initializer=thumbnails.setup_worker,
+                ) as executor:
+                    valid, peak, elapsed = executor.submit(
+                        measure, payload.name, overrides, decode
+                    ).result()
+                self.stdout.write(
+                    f'{name:<40} прирост пика памяти {peak / 1024:7.1f} МБ, '
+                    f'{elapsed * 1000:7.1f} мс, форма '
+                    f'{"принята" if valid else "отклонена"}'
+                )
+        finally:
+            os.unlink(payload.name)
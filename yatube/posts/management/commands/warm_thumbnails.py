@@ -0,0 +1,98 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def warm(name):
+    try:
+        thumbnails.generate(name)
+    except Exception as error:
+        return name, str(error)
+    return name, None
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры всех картинок постов для всех геометрий из '
+        'settings.POST_THUMBNAILS в пуле процессов. Готовые миниатюры '
+        'пропускаются, поэтому прерванный прогон можно просто повторить.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Размер пула процессов; 0 — работать в текущем процессе.',
+        )
+        parser.add_argument('--batch', type=int, default=200)
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Не пропускать картинки с готовыми миниатюрами.',
+        )
+
+    def images(self, force):
+        names = (
+            Post.objects.exclude(image='')
+            .exclude(image__isnull=True)
+            .order_by('pk')
+            .values_list('image', flat=True)
+            .iterator()
+        )
+        seen = set()
+        for name in names:
+            if name in seen:
+                continue
+            seen.add(name)
+            if force or not thumbnails.is_ready(name):
+                yield name
+            else:
+                self.skipped += 1
+
+    def handle(self, *args, workers, batch, force, **options):
+        self.skipped = self.done = self.failed = 0
+        started = time.perf_counter()
+        if workers:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context('spawn'),
+                initializer=thumbnails.setup_worker,
+            ) as executor:
+                self.warm_all(executor.map, batch, force)
+        else:
+            self.warm_all(map, batch, force)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Обработано {self.done} картинок за {elapsed:.1f} с '
+                f'({self.done / elapsed if elapsed else 0:.1f} картинок/с), '
+                f'пропущено готовых {self.skipped}, ошибок {self.failed}'
+            )
+        )
+
+    def warm_all(self, mapper, batch, force):
+        pending = []
+        for name in self.images(force):
+            pending.append(name)
+            if len(pending) == batch:
+                self.warm_batch(mapper, pending)
+                pending = []
+        if pending:
+            self.warm_batch(mapper, pending)
+
+    def warm_batch(self, mapper, names):
+        for name, error in mapper(warm, names):
+            self.done += 1
+            if error is not None:
+                self.failed += 1
+                self.stderr.write(f'{name}: {error}')
+        self.stdout.write(
+            f'Обработано {self.done}, пропущено {self.skipped}, '
+            f'ошибок {self.failed}'
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_auto_20221108_1406'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ['-pub_date', '-pk'], 'verbose_name': 'Публикации', 'verbose_name_plural': 'Публикации'},
+        ),
+    ]
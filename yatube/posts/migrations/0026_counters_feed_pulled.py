@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pulled(apps, schema_editor):
+    # До этой миграции режим автора определялся числом подписчиков
+    UserCounters = apps.get_model('posts', 'UserCounters')
+    UserCounters.objects.filter(
+        followers_count__gte=settings.FEED_FANOUT_LIMIT
+    ).update(feed_pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercounters',
+            name='feed_pulled',
+            field=models.BooleanField(default=False, verbose_name='Посты подтягиваются при чтении ленты'),
+        ),
+        migrations.AddIndex(
+            model_name='usercounters',
+            index=models.Index(fields=['feed_pulled', 'followers_count'], name='counters_feed_mode_idx'),
+        ),
+        migrations.RunPython(mark_pulled, migrations.RunPython.noop),
+    ]
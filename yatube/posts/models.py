@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import post_images
+
 User = get_user_model()
 
 
@@ -8,6 +10,9 @@ class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name='имя сообщества')
     slug = models.SlugField(unique=True, verbose_name='ссылка')
     description = models.TextField(verbose_name='Описание сообщества')
+    posts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Число постов'
+    )
 
     class Meta:
         verbose_name = 'Группы'
@@ -26,10 +31,17 @@ class Post(models.Model):
         db_index=True,
         verbose_name='Дата публикации',
     )
+    edited = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
+    # Отдельные индексы внешних ключей не нужны: их заменяют составные
+    # индексы лент автора и группы из Meta.indexes
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='posts',
+        db_index=False,
         verbose_name='Автор публикации',
     )
     group = models.ForeignKey(
@@ -38,11 +50,20 @@ class Post(models.Model):
         null=True,
         on_delete=models.SET_NULL,
         related_name='posts',
+        db_index=False,
         verbose_name='Сообщество',
         help_text='Группа, к которой будет' ' относиться пост',
     )
     image = models.ImageField(
-        'Картинка', upload_to='posts/', blank=True, null=True
+        'Картинка',
+        upload_to='posts/',
+        storage=post_images,
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Число комментариев'
     )
 
     def __str__(self):
@@ -51,7 +72,17 @@ class Post(models.Model):
     class Meta:
         verbose_name = 'Публикации'
         verbose_name_plural = 'Публикации'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-pk']
+        indexes = [
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -76,9 +107,14 @@ class Comment(models.Model):
     )
 
     class Meta:
-        ordering = ['-created']
+        ordering = ['-created', '-pk']
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.text[:15]}'
@@ -89,12 +125,20 @@ class Follow(models.Model):
         User, on_delete=models.CASCADE, related_name='follower'
     )
     author = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name='following'
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        db_index=False,
     )
 
     class Meta:
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 name='couple_user_and_author_unique',
@@ -104,3 +148,94 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.author[:15]}'
+
+
+class UserCounters(models.Model):
+    """Счётчики пользователя, которые поддерживаются сигналами."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Число постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='Число подписок'
+    )
+    feed_pulled = models.BooleanField(
+        default=False, verbose_name='Посты подтягиваются при чтении ленты'
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+        indexes = [
+            models.Index(
+                fields=['followers_count'], name='counters_followers_idx'
+            ),
+            models.Index(
+                fields=['feed_pulled', 'followers_count'],
+                name='counters_feed_mode_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count}'
+
+
+class FeedEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ['-pub_date', '-post_id']
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                name='feed_user_and_post_unique',
+                fields=['user', 'post'],
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class SearchTerm(models.Model):
+    """Обратный индекс поиска: основа слова и пост, где она встречается."""
+
+    term = models.CharField(max_length=100, verbose_name='Основа слова')
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='search_terms'
+    )
+    frequency = models.PositiveIntegerField(verbose_name='Число вхождений')
+
+    class Meta:
+        verbose_name = 'Основа слова'
+        verbose_name_plural = 'Поисковый индекс'
+        indexes = [
+            models.Index(fields=['term', 'post'], name='search_term_post_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.term}: {self.post_id}'
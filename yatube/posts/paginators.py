@@ -0,0 +1,264 @@
+import heapq
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+def encode_cursor(direction, key=None):
+    """Упаковывает направление и ключ записи в непрозрачный токен."""
+    raw = direction
+    if key is not None:
+        raw = f'{direction}|{key[0].isoformat()}|{key[1]}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для испорченного токена возвращает None."""
+    try:
+        raw = urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+    except (DecodeError, UnicodeDecodeError, ValueError):
+        return None
+    direction, *key = raw.split('|')
+    if direction not in (FORWARD, BACKWARD):
+        return None
+    if not key:
+        return direction, None
+    if len(key) != 2 or not key[1].isdigit():
+        return None
+    moment = parse_datetime(key[0])
+    if moment is None:
+        return None
+    return direction, (moment, int(key[1]))
+
+
+def estimate_count(queryset):
+    """Число строк таблицы по статистике базы, без ``COUNT(*)``.
+
+    Годится только для выборки без условий; если статистики нет (в SQLite
+    она появляется после ``ANALYZE``), возвращает None.
+    """
+    query = queryset.query
+    if (
+        query.where.children
+        or query.distinct
+        or query.combinator
+        or query.low_mark
+        or query.high_mark is not None
+    ):
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [table],
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    'SELECT name FROM sqlite_master WHERE name = %s',
+                    ['sqlite_stat1'],
+                )
+                if cursor.fetchone() is None:
+                    return None
+                # Первое число статистики индекса — число строк таблицы
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table],
+                )
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0].split('.')[0])
+    return estimate if estimate > 0 else None
+
+
+class CachedCountPaginator(Paginator):
+    """Нумерованная пагинация без ``COUNT(*)`` на каждый запрос.
+
+    Число записей выборки кешируется на ``PAGINATOR_COUNT_TTL`` секунд, а
+    для таблиц больше ``PAGINATOR_ESTIMATE_ABOVE`` строк без фильтров
+    берётся из статистики базы. Пока число не обновилось, последняя
+    страница может оказаться неполной или пустой. Вместо всех номеров
+    страниц шаблон получает ``page.elided_page_range`` — окно вокруг
+    текущей страницы и края ленты.
+    """
+
+    ELLIPSIS = '…'
+
+    def count_key(self):
+        if not isinstance(self.object_list, QuerySet):
+            return None
+        query = str(self.object_list.query).encode()
+        return f'paginator:count:{md5(query).hexdigest()}'
+
+    @cached_property
+    def count(self):
+        key = self.count_key()
+        if key is None:
+            return super().count
+        count = cache.get(key)
+        if count is None:
+            count = estimate_count(self.object_list)
+            if count is None or count < settings.PAGINATOR_ESTIMATE_ABOVE:
+                count = self.object_list.count()
+            cache.set(key, count, settings.PAGINATOR_COUNT_TTL)
+        return count
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Номера страниц с многоточиями вместо длинных промежутков."""
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2 + 1:
+            yield from self.page_range
+            return
+        if number > on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+    def page(self, number):
+        page = super().page(number)
+        page.elided_page_range = list(self.get_elided_page_range(page.number))
+        return page
+
+
+class CursorPaginator(CachedCountPaginator):
+    """Пагинация по ключу вместо OFFSET.
+
+    Лента упорядочена по убыванию пары ``key`` (по умолчанию
+    ``(pub_date, pk)``), поэтому следующая страница выбирается условием
+    «строго меньше последней показанной записи» и стоит одинаково на любой
+    глубине. Страница не знает своего номера, поэтому паджинатор описывает
+    окно из не более чем трёх страниц: предыдущей, текущей и следующей.
+    Обычный ``get_page`` по номеру страницы продолжает работать, но не
+    глубже ``max_pages``: дальше номера в окне страниц не показываются.
+    """
+
+    def __init__(self, object_list, per_page, key=('pub_date', 'pk'),
+                 max_pages=None, **kw):
+        super().__init__(object_list, per_page, **kw)
+        self.key = key
+        self.max_pages = max_pages
+
+    @cached_property
+    def num_pages(self):
+        num_pages = super().num_pages
+        if self.max_pages is not None:
+            num_pages = min(num_pages, self.max_pages)
+        return num_pages
+
+    def _key_of(self, obj):
+        return tuple(getattr(obj, field) for field in self.key)
+
+    def _after(self, key):
+        first, second = self.key
+        return Q(**{f'{first}__lt': key[0]}) | Q(
+            **{first: key[0], f'{second}__lt': key[1]}
+        )
+
+    def _before(self, key):
+        first, second = self.key
+        return Q(**{f'{first}__gt': key[0]}) | Q(
+            **{first: key[0], f'{second}__gt': key[1]}
+        )
+
+    def _fetch(self, direction, key, limit):
+        """Возвращает до ``limit`` записей за ключом в порядке обхода."""
+        first, second = self.key
+        queryset = self.object_list
+        if direction == FORWARD:
+            if key is not None:
+                queryset = queryset.filter(self._after(key))
+            queryset = queryset.order_by(f'-{first}', f'-{second}')
+        else:
+            if key is not None:
+                queryset = queryset.filter(self._before(key))
+            queryset = queryset.order_by(first, second)
+        return list(queryset[:limit])
+
+    def get_cursor_page(self, token=None):
+        """Возвращает страницу, на которую указывает токен ``?cursor=``."""
+        cursor = decode_cursor(token) if token else None
+        direction, key = cursor or (FORWARD, None)
+        objects = self._fetch(direction, key, self.per_page + 1)
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if direction == FORWARD:
+            has_previous, has_next = key is not None, has_more
+        else:
+            objects.reverse()
+            has_previous, has_next = has_more, key is not None
+        if not objects:
+            has_previous = has_next = False
+        number = 2 if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        self.count = len(objects)
+        page = Page(objects, number, self)
+        page.previous_cursor = (
+            encode_cursor(BACKWARD, self._key_of(objects[0]))
+            if has_previous else None
+        )
+        page.next_cursor = (
+            encode_cursor(FORWARD, self._key_of(objects[-1]))
+            if has_next else None
+        )
+        page.last_cursor = encode_cursor(BACKWARD) if has_next else None
+        return page
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Курсорная пагинация по нескольким упорядоченным источникам сразу.
+
+    ``sources`` — список пар ``(paginator, attr)``: каждый источник сам
+    выбирает свою порцию за ключом, ``attr`` (если задан) достаёт из
+    записи итоговый объект. Порции сливаются k-путевым слиянием по ключу
+    ``key`` итоговых объектов, повторы одного объекта отбрасываются.
+    Нумерованные страницы не поддерживаются.
+    """
+
+    def __init__(self, sources, per_page, key=('pub_date', 'pk'), **kw):
+        super().__init__(sources, per_page, key=key, **kw)
+
+    def _fetch(self, direction, key, limit):
+        portions = []
+        for paginator, attr in self.object_list:
+            objects = paginator._fetch(direction, key, limit)
+            if attr is not None:
+                objects = [getattr(obj, attr) for obj in objects]
+            portions.append(objects)
+        merged = heapq.merge(
+            *portions, key=self._key_of, reverse=direction == FORWARD
+        )
+        result, seen = [], set()
+        for obj in merged:
+            if obj.pk in seen:
+                continue
+            seen.add(obj.pk)
+            result.append(obj)
+            if len(result) == limit:
+                break
+        return result
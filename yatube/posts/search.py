@@ -0,0 +1,212 @@
+"""Полнотекстовый поиск по постам.
+
+Текст поста разбивается на слова, русские слова приводятся к основе
+стеммером Портера, и основы попадают в индекс. На SQLite со сборкой FTS5
+индексом служит виртуальная таблица ``posts_post_fts`` с ранжированием
+BM25; на остальных базах — таблица ``SearchTerm`` (обратный индекс
+«основа → пост»), ранжирование TF-IDF считается в Python. Выбор задаёт
+``settings.POST_SEARCH_BACKEND``: ``auto``, ``fts5`` или ``inverted``.
+Индекс обновляется сигналами при сохранении и удалении поста.
+"""
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import Post, SearchTerm
+from .paginators import estimate_count
+
+FTS_TABLE = 'posts_post_fts'
+# Больше результатов поиск не возвращает; страница об этом предупреждает
+MAX_RESULTS = 1000
+POST_TOTAL_KEY = 'search:post_total'
+
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-яё]')
+
+VOWELS = 'аеиоуыэюя'
+RV = re.compile(rf'^(.*?[{VOWELS}])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL = re.compile(rf'.*[^{VOWELS}]+[{VOWELS}].*ость?$')
+DERIVATIONAL_SUFFIX = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def stem(word):
+    """Основа русского слова по алгоритму Портера (Snowball)."""
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    without_gerund = PERFECTIVE_GERUND.sub('', rv, 1)
+    if without_gerund != rv:
+        rv = without_gerund
+    else:
+        rv = REFLEXIVE.sub('', rv, 1)
+        without_adjective = ADJECTIVE.sub('', rv, 1)
+        if without_adjective != rv:
+            rv = PARTICIPLE.sub('', without_adjective, 1)
+        else:
+            without_verb = VERB.sub('', rv, 1)
+            if without_verb != rv:
+                rv = without_verb
+            else:
+                rv = NOUN.sub('', rv, 1)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL.match(rv):
+        rv = DERIVATIONAL_SUFFIX.sub('', rv, 1)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def tokenize(text):
+    """Список основ слов текста; нерусские слова только в нижнем регистре."""
+    return [
+        stem(word) if CYRILLIC.search(word) else word
+        for word in WORD.findall(text.lower())
+    ]
+
+
+@lru_cache(maxsize=None)
+def fts5_available():
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def use_fts5():
+    backend = getattr(settings, 'POST_SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        return fts5_available()
+    return backend == 'fts5'
+
+
+def index_post(post):
+    """Заносит текст поста в индекс, заменяя прежнюю запись."""
+    tokens = tokenize(post.text)
+    if use_fts5():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, ' '.join(tokens)],
+            )
+        return
+    SearchTerm.objects.filter(post_id=post.pk).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term[:100], post_id=post.pk, frequency=frequency)
+        for term, frequency in Counter(tokens).items()
+    )
+
+
+def remove_post(post_id):
+    if use_fts5():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+    # Строки SearchTerm удаляет каскад внешнего ключа.
+
+
+def rebuild():
+    """Переиндексирует все посты."""
+    if use_fts5():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchTerm.objects.all().delete()
+    for post in Post.objects.only('pk', 'text').iterator():
+        index_post(post)
+
+
+def _fts5_ids(terms, limit):
+    query = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s',
+            [query, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def post_total():
+    """Число постов для IDF: из кеша, по статистике базы или COUNT(*)."""
+    total = cache.get(POST_TOTAL_KEY)
+    if total is None:
+        posts = Post.objects.all()
+        total = estimate_count(posts) or posts.count()
+        cache.set(POST_TOTAL_KEY, total, settings.PAGINATOR_COUNT_TTL)
+    return total
+
+
+def _inverted_ids(terms, limit):
+    terms = set(terms)
+    postings = {}
+    rows = SearchTerm.objects.filter(term__in=terms).values_list(
+        'term', 'post_id', 'frequency'
+    )
+    for term, post_id, frequency in rows:
+        postings.setdefault(term, {})[post_id] = frequency
+    if len(postings) < len(terms):
+        return []
+    total = max(post_total(), 1)
+    scores = None
+    for posts in postings.values():
+        idf = math.log(1 + total / len(posts))
+        term_scores = {
+            post_id: (1 + math.log(frequency)) * idf
+            for post_id, frequency in posts.items()
+        }
+        if scores is None:
+            scores = term_scores
+        else:
+            scores = {
+                post_id: score + term_scores[post_id]
+                for post_id, score in scores.items()
+                if post_id in term_scores
+            }
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+    return [post_id for post_id, _ in ranked[:limit]]
+
+
+def search_ids(query, limit=MAX_RESULTS):
+    """id постов, содержащих все слова запроса, от лучших к худшим."""
+    terms = [term[:100] for term in tokenize(query)]
+    if not terms:
+        return []
+    if use_fts5():
+        return _fts5_ids(terms, limit)
+    return _inverted_ids(terms, limit)
@@ -0,0 +1,139 @@
+"""Хранилище картинок постов с адресацией по содержимому.
+
+Файл сохраняется под именем ``<каталог>/<ab>/<sha256>.<расширение>``, где
+хеш считается по загруженным байтам. Одинаковые картинки лежат на диске
+один раз, а посты ссылаются на одно имя, поэтому и миниатюры sorl у них
+общие. Число ссылок — это число постов с таким именем; файл удаляется,
+когда ссылок не осталось (см. ``thumbnails.release``).
+
+Пост с загруженным файлом ещё может быть не зафиксирован, поэтому каждая
+загрузка открывает в общем кеше счётчик незавершённых загрузок имени, а
+фиксация поста его уменьшает (``end_upload``). Пока счётчик не ноль,
+``release`` файл не удаляет. Загрузка, чья транзакция откатилась, держит
+счётчик ``ORPHAN_MIN_AGE``; осиротевший файл потом убирает
+``dedupe_images``, которая не трогает файлы моложе того же срока.
+
+Только что записанный файл запоминается до ``take_created``: перекодировать
+без метаданных нужно только его, а не повторную загрузку тех же байтов.
+"""
+import hashlib
+import os
+import posixpath
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+ORPHAN_MIN_AGE = timedelta(hours=1)
+
+
+def uploading_key(name):
+    return f'images:uploading:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    _created = threading.local()
+
+    def content_name(self, name, content):
+        """Имя файла по хешу содержимого с расширением из ``name``."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        hexdigest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            posixpath.dirname(name), hexdigest[:2], hexdigest + extension
+        )
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        self.begin_upload(name)
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        name = super()._save(name, content)
+        self.created_names().add(name)
+        return name
+
+    def begin_upload(self, name):
+        key = uploading_key(name)
+        cache.add(key, 0, ORPHAN_MIN_AGE.total_seconds())
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, ORPHAN_MIN_AGE.total_seconds())
+        self.uploaded_names().add(name)
+
+    def end_upload(self, name):
+        """Отмечает, что пост с загруженным файлом зафиксирован."""
+        key = uploading_key(name)
+        try:
+            if cache.decr(key) <= 0:
+                cache.delete(key)
+        except ValueError:
+            pass
+
+    def is_uploading(self, name):
+        """Есть ли незафиксированные посты с загрузкой этого файла."""
+        return bool(cache.get(uploading_key(name)))
+
+    def uploaded_names(self):
+        if not hasattr(self._created, 'uploaded'):
+            self._created.uploaded = set()
+        return self._created.uploaded
+
+    def take_uploaded(self, name):
+        """Загружал ли файл ``name`` этот поток; отвечает True один раз."""
+        names = self.uploaded_names()
+        if name in names:
+            names.discard(name)
+            return True
+        return False
+
+    def is_recent(self, name):
+        """Записан или загружен повторно меньше ``ORPHAN_MIN_AGE`` назад."""
+        threshold = timezone.now() - ORPHAN_MIN_AGE
+        return self.get_modified_time(name) > threshold
+
+    def created_names(self):
+        if not hasattr(self._created, 'names'):
+            self._created.names = set()
+        return self._created.names
+
+    def take_created(self, name):
+        """Записал ли файл ``name`` этот поток; отвечает True один раз."""
+        names = self.created_names()
+        if name in names:
+            names.discard(name)
+            return True
+        return False
+
+    def replace(self, name, content):
+        """Перезаписывает файл, не пересчитывая имя.
+
+        Содержимое пишется во временный файл рядом и подменяет старое через
+        ``os.replace``, поэтому файл не пропадает ни на миг.
+        """
+        path = self.path(name)
+        descriptor, temporary = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix='.', suffix='.tmp'
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            shutil.copymode(path, temporary)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return name
+
+
+post_images = ContentAddressedStorage()
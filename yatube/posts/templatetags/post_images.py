@@ -0,0 +1,11 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image):
+    """Варианты картинки для <picture> или размеры заглушки, пока их нет."""
+    return thumbnails.get_picture(image)
@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..views import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(COMMENTS_PER_PAGE + 5)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_post_detail_shows_first_batch_with_load_more(self):
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = list(response.context['comments'])
+        self.assertEqual(comments, list(Comment.objects.all()[:20]))
+        self.assertContains(response, 'data-load-more')
+
+    def test_load_more_returns_next_batch_only(self):
+        detail = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(
+                reverse(
+                    'posts:post_comments', kwargs={'post_id': self.post.pk}
+                ),
+                {'cursor': detail.context['comments_page'].next_cursor},
+            )
+        self.assertEqual(
+            list(response.context['comments']),
+            list(Comment.objects.all()[COMMENTS_PER_PAGE:]),
+        )
+        self.assertNotContains(response, 'data-load-more')
+        self.assertNotContains(response, '<html')
+
+    def test_load_more_for_missing_post(self):
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,147 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core import replicas
+from core.replicas import read_from_replica
+
+from .. import caching, views
+from ..caching import cache_versioned
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feeds_answer_not_modified_without_queries(self):
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        ):
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_feed_etag_changes_with_content_user_and_page(self):
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        self.assertNotEqual(self.authorized_client.get(url)['ETag'], etag)
+        self.assertNotEqual(
+            self.guest_client.get(url, {'page': 2})['ETag'], etag
+        )
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_is_not_modified_until_commented(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+
+    def test_post_detail_changes_after_author_and_group_renames(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        for model, obj, fields in (
+            (User, self.user, {'first_name': 'Новое имя'}),
+            (Group, self.group, {'title': 'Новое название'}),
+        ):
+            with self.subTest(model=model.__name__):
+                etag = self.guest_client.get(url)['ETag']
+                model.objects.filter(pk=obj.pk).update(**fields)
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, *fields.values())
+
+    def test_not_modified_repeats_etag(self):
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ):
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_not_modified_varies_on_cookie(self):
+        # Без SessionMiddleware: Vary не должен зависеть от чтения сессии
+        for view, kwargs in (
+            (views.index, {}),
+            (views.post_detail, {'post_id': self.post.pk}),
+        ):
+            with self.subTest(view=view.__name__):
+                request = RequestFactory().get('/')
+                request.user = AnonymousUser()
+                etag = view(request, **kwargs)['ETag']
+                request = RequestFactory().get('/', HTTP_IF_NONE_MATCH=etag)
+                request.user = AnonymousUser()
+                response = view(request, **kwargs)
+                self.assertEqual(response.status_code, 304)
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_missing_post_is_still_not_found(self):
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 0}),
+            HTTP_IF_NONE_MATCH='*',
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_replica_render_waits_out_lag_after_bump(self):
+        view = read_from_replica(
+            cache_versioned('index')(
+                lambda request: HttpResponse(replicas.current() or 'default')
+            )
+        )
+
+        def get(path):
+            request = RequestFactory().get(path)
+            request.user = AnonymousUser()
+            return view(request)
+
+        caching.invalidate('index')
+        response = get('/')
+        self.assertEqual(response.content, b'default')
+        self.assertIn('ETag', response)
+        # Отметка сброса истекла через REPLICA_MAX_LAG
+        cache.delete(caching.bumped_key('index'))
+        response = get('/?page=2')
+        self.assertEqual(response.content, b'replica')
+        self.assertIn('ETag', response)
@@ -0,0 +1,187 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import feeds
+from ..models import FeedEntry, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        for i in range(5):
+            Post.objects.create(author=cls.author, text=str(i))
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self):
+        return list(
+            Post.objects.filter(feed_entries__user=self.reader).order_by(
+                '-feed_entries__pub_date', '-pk'
+            )
+        )
+
+    def test_follow_backfills_feed(self):
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(self.feed(), list(self.author.posts.all()))
+
+    def test_new_post_is_pushed_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='новый')
+        self.assertEqual(self.feed()[0], post)
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_unfollow_drops_author_posts(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    @override_settings(FEED_LENGTH=3)
+    def test_feed_is_trimmed_to_configured_length(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), list(self.author.posts.all()[:3]))
+        post = Post.objects.create(author=self.author, text='новый')
+        feed = self.feed()
+        self.assertEqual(len(feed), 3)
+        self.assertEqual(feed[0], post)
+
+    @override_settings(FEED_LENGTH=3)
+    def test_many_followers_are_trimmed_in_batches(self):
+        readers = [
+            User.objects.create_user(username=f'reader_{i}') for i in range(5)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=self.author) for reader in readers
+        )
+        FeedEntry.objects.bulk_create(
+            FeedEntry(user=reader, post=post, pub_date=post.pub_date)
+            for reader in readers
+            for post in self.author.posts.all()
+        )
+        with mock.patch.object(feeds, 'TRIM_BATCH', 2), \
+                CaptureQueriesContext(connection) as queries:
+            feeds.trim([reader.pk for reader in readers])
+        for reader in readers:
+            with self.subTest(reader=reader.username):
+                self.assertEqual(
+                    FeedEntry.objects.filter(user=reader).count(), 3
+                )
+        # Три пачки по не больше чем два id
+        self.assertEqual(
+            sum('GROUP BY' in query['sql'] for query in queries), 3
+        )
+
+
+@override_settings(FEED_FANOUT_LIMIT=2)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.star = User.objects.create_user(username='star')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=cls.fan, author=cls.star)
+
+    def setUp(self):
+        cache.clear()
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        feeds.rebalance()
+        # Множество читаемых авторов в кеше переживает откат теста
+        self.addCleanup(cache.clear)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_popular_author_is_not_fanned_out(self):
+        Post.objects.create(author=self.star, text='звезда')
+        Post.objects.create(author=self.author, text='автор')
+        self.assertEqual(
+            list(
+                FeedEntry.objects.filter(user=self.reader).values_list(
+                    'post__author__username', flat=True
+                )
+            ),
+            ['author'],
+        )
+
+    def test_feed_merges_pushed_and_pulled_posts(self):
+        for i in range(8):
+            Post.objects.create(author=self.star, text=f'звезда {i}')
+            Post.objects.create(author=self.author, text=f'автор {i}')
+        expected = list(Post.objects.all())
+        seen = []
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        while True:
+            page = response.context['page_obj']
+            seen.extend(page)
+            if not page.has_next():
+                break
+            response = self.reader_client.get(
+                reverse('posts:follow_index'), {'cursor': page.next_cursor}
+            )
+        self.assertEqual(seen, expected)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def rebalance(self):
+        call_command('rebalance_feeds', stdout=StringIO())
+
+    def test_author_below_limit_gets_pulled_posts_pushed(self):
+        post = Post.objects.create(author=self.star, text='звезда')
+        self.assertEqual(self.feed(), [post])
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        # Отписка не раскладывает посты по лентам сама
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post])
+        self.rebalance()
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_author_above_limit_is_pulled_by_rebalance(self):
+        pushed = Post.objects.create(author=self.author, text='до порога')
+        self.assertEqual(self.feed(), [pushed])
+        Follow.objects.create(user=self.fan, author=self.author)
+        self.assertEqual(self.feed(), [pushed])
+        self.rebalance()
+        self.assertFalse(
+            FeedEntry.objects.filter(post__author=self.author).exists()
+        )
+        pulled = Post.objects.create(author=self.author, text='после порога')
+        self.assertEqual(self.feed(), [pulled, pushed])
+
+    @override_settings(FEED_FANOUT_LIMIT=10, FEED_PUSH_RATIO=0.8)
+    def test_author_near_limit_keeps_mode(self):
+        counters = UserCounters.objects.filter(user=self.author)
+        for followers, pulled in ((10, True), (9, True), (8, True),
+                                  (7, False), (9, False), (10, True)):
+            with self.subTest(followers=followers):
+                counters.update(followers_count=followers)
+                feeds.rebalance()
+                self.assertEqual(
+                    self.author.pk in feeds.pulled_authors(), pulled
+                )
@@ -108,7 +108,7 @@ class PostFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.id, form_data['group'])
         self.assertEqual(uploaded, form_data['image'])
-        self.assertEqual(post.image.name, 'posts/' + form_data['image'].name)
+        self.assertRegex(post.image.name, r'^posts/\w\w/\w{64}\.gif$')
 
     def test_create_post_for_authorized_client(self):
         posts_count = Post.objects.count()
@@ -0,0 +1,164 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import live
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+def run_immediately(func):
+    func()
+
+
+@override_settings(
+    LIVE_SSE=True, LIVE_POLL_INTERVAL=0, LIVE_STREAM_TIMEOUT=0.2
+)
+@mock.patch.object(live.transaction, 'on_commit', run_immediately)
+class LiveFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(live, 'broker', live.Broker())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def events(self, response):
+        """События потока без служебных строк retry и ping."""
+        content = b''.join(response.streaming_content).decode()
+        return [
+            chunk
+            for chunk in content.split('\n\n')
+            if chunk and not chunk.startswith(('retry:', ':'))
+        ]
+
+    def test_broker_wakes_waiting_thread(self):
+        broker = live.Broker()
+        result = []
+        waiter = threading.Thread(
+            target=lambda: result.append(broker.wait(0, 5))
+        )
+        waiter.start()
+        broker.publish(7)
+        waiter.join(1)
+        self.assertEqual(result, [7])
+
+    def test_new_post_updates_shared_last_id(self):
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(cache.get(live.LAST_POST_KEY), post.pk)
+        self.assertEqual(live.broker.wait(self.old_post.pk, 0), post.pk)
+
+    def test_stream_sends_new_post_ids(self):
+        first = Post.objects.create(author=self.author, text='Первый')
+        second = Post.objects.create(author=self.other, text='Второй')
+        response = self.guest_client.get(
+            reverse('posts:live_events'), {'after': self.old_post.pk}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(
+            self.events(response),
+            [
+                f'id: {second.pk}\nevent: posts\n'
+                f'data: [{second.pk}, {first.pk}]'
+            ],
+        )
+
+    def test_last_event_id_overrides_after(self):
+        post = Post.objects.create(author=self.author, text='Новый')
+        response = self.guest_client.get(
+            reverse('posts:live_events'),
+            {'after': self.old_post.pk},
+            HTTP_LAST_EVENT_ID=str(post.pk),
+        )
+        self.assertEqual(self.events(response), [])
+
+    def test_follow_stream_skips_other_authors(self):
+        other_post = Post.objects.create(author=self.other, text='Чужой')
+        response = self.reader_client.get(
+            reverse('posts:live_events'),
+            {'feed': 'follow', 'after': self.old_post.pk},
+        )
+        self.assertEqual(self.events(response), [f'id: {other_post.pk}'])
+
+    def test_follow_stream_requires_login(self):
+        response = self.guest_client.get(
+            reverse('posts:live_events'), {'feed': 'follow'}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_live_posts_renders_only_new_cards(self):
+        post = Post.objects.create(author=self.author, text='Свежий пост')
+        Post.objects.create(author=self.other, text='Пост не из подписок')
+        response = self.reader_client.get(
+            reverse('posts:live_posts'),
+            {'feed': 'follow', 'after': self.old_post.pk},
+        )
+        self.assertEqual(list(response.context['posts']), [post])
+        self.assertEqual(response['X-Latest-Post'], str(post.pk))
+        self.assertContains(response, 'Свежий пост')
+        self.assertNotContains(response, 'Старый')
+        self.assertNotContains(response, '<html')
+
+    def test_feed_pages_subscribe_to_updates(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'data-feed="follow"')
+        self.assertContains(
+            response, f'data-after="{self.old_post.pk}"'
+        )
+        self.assertContains(response, 'data-events=')
+
+
+@override_settings(LIVE_SSE=False)
+@mock.patch.object(live.transaction, 'on_commit', run_immediately)
+class LivePollTests(TestCase):
+    """Под WSGI лента опрашивает сервер, не держа соединение."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_wsgi_default_does_not_render_event_source(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'data-poll=')
+        self.assertNotContains(response, 'data-events=')
+
+    def test_event_stream_is_disabled(self):
+        response = self.client.get(reverse('posts:live_events'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_poll_answers_without_waiting(self):
+        response = self.client.get(
+            reverse('posts:live_poll'), {'after': self.old_post.pk}
+        )
+        self.assertEqual(
+            response.json(), {'latest': self.old_post.pk, 'posts': []}
+        )
+        post = Post.objects.create(author=self.author, text='Новый')
+        response = self.client.get(
+            reverse('posts:live_poll'), {'after': self.old_post.pk}
+        )
+        self.assertEqual(
+            response.json(), {'latest': post.pk, 'posts': [post.pk]}
+        )
@@ -0,0 +1,171 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..paginators import CachedCountPaginator, decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.user = User.objects.create_user(username='author')
+        for i in range(25):
+            Post.objects.create(author=cls.user, text=str(i), group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def walk(self, url):
+        seen = []
+        response = self.guest_client.get(url)
+        while True:
+            page = response.context['page_obj']
+            seen.extend(page)
+            if not page.has_next():
+                return seen, page
+            response = self.guest_client.get(
+                url, {'cursor': page.next_cursor}
+            )
+
+    def test_cursor_pages_cover_feed_without_gaps(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                seen, last_page = self.walk(url)
+                self.assertEqual(seen, list(Post.objects.all()))
+                self.assertEqual(len(last_page), 5)
+                self.assertTrue(last_page.has_previous())
+
+    def test_previous_cursor_returns_to_previous_page(self):
+        url = reverse('posts:index')
+        first = self.guest_client.get(url).context['page_obj']
+        second = self.guest_client.get(
+            url, {'cursor': first.next_cursor}
+        ).context['page_obj']
+        back = self.guest_client.get(
+            url, {'cursor': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_last_cursor_returns_oldest_posts(self):
+        url = reverse('posts:index')
+        first = self.guest_client.get(url).context['page_obj']
+        last = self.guest_client.get(
+            url, {'cursor': first.last_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(last), list(Post.objects.all()[15:]))
+        self.assertFalse(last.has_next())
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        url = reverse('posts:index')
+        for token in ('', 'мусор', encode_cursor('x'), 'bnwxfDE'):
+            with self.subTest(token=token):
+                page = self.guest_client.get(
+                    url, {'cursor': token}
+                ).context['page_obj']
+                self.assertEqual(list(page), list(Post.objects.all()[:10]))
+
+    def test_cursor_round_trip(self):
+        post = Post.objects.first()
+        token = encode_cursor('n', (post.pub_date, post.pk))
+        self.assertEqual(decode_cursor(token), ('n', (post.pub_date, post.pk)))
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        for i in range(25):
+            Post.objects.create(author=cls.user, text=str(i))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached_between_requests(self):
+        self.assertEqual(
+            CachedCountPaginator(Post.objects.all(), 10).count, 25
+        )
+        Post.objects.create(author=self.user, text='Новый')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(Post.objects.all(), 10).count, 25
+            )
+        self.assertEqual(
+            CachedCountPaginator(Post.objects.filter(text='1'), 10).count, 1
+        )
+
+    @override_settings(PAGINATOR_ESTIMATE_ABOVE=10)
+    def test_large_unfiltered_table_is_estimated_from_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.filter(text='0').delete()
+        paginator = CachedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 25)
+        self.assertEqual(
+            CachedCountPaginator(Post.objects.filter(text='1'), 10).count, 1
+        )
+
+    def test_elided_page_range(self):
+        paginator = CachedCountPaginator(list(range(500)), 10)
+        ellipsis = paginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(25)),
+            [1, ellipsis, 23, 24, 25, 26, 27, ellipsis, 50],
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(2)),
+            [1, 2, 3, 4, ellipsis, 50],
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(50)),
+            [1, ellipsis, 48, 49, 50],
+        )
+        self.assertEqual(
+            list(CachedCountPaginator(list(range(50)), 10).page_range),
+            list(
+                CachedCountPaginator(
+                    list(range(50)), 10
+                ).get_elided_page_range(3)
+            ),
+        )
+
+    def test_numbered_feed_renders_page_window(self):
+        for i in range(100):
+            Post.objects.create(author=self.user, text=str(i))
+        response = Client().get(reverse('posts:index'), {'page': 6})
+        self.assertEqual(
+            response.context['page_obj'].elided_page_range,
+            [1, '…', 4, 5, 6, 7, 8, '…', 13],
+        )
+        self.assertContains(response, 'page=13')
+        self.assertNotContains(response, 'page=10"')
+
+    @override_settings(PAGINATOR_MAX_PAGE=2)
+    def test_deep_page_number_is_refused_without_queries(self):
+        url = reverse('posts:index')
+        with self.assertNumQueries(0):
+            response = Client().get(url, {'page': 5000})
+        self.assertEqual(response.status_code, 404)
+        response = Client().get(url, {'page': 2})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertEqual(page_obj.elided_page_range, [1, 2])
+        self.assertNotContains(response, 'page=3')
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+# Бюджеты запросов вьюх для авторизованного пользователя, включая
+# запросы сессии и пользователя. Не зависят от числа постов на странице.
+BUDGETS = {
+    'posts:index': 3,
+    'posts:group_list': 4,
+    'posts:profile': 5,
+    'posts:post_detail': 4,
+    'posts:follow_index': 5,
+}
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, text='Первый', group=cls.group
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def urls(self):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': 'author'}
+            ),
+            'posts:post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+
+    def count_queries(self):
+        counts = {}
+        for name, url in self.urls().items():
+            cache.clear()
+            with self.assertQueryBudget(BUDGETS[name], name) as context:
+                self.client.get(url)
+            counts[name] = len(context.captured_queries)
+        return counts
+
+    def test_views_fit_query_budget_independent_of_page_size(self):
+        small = self.count_queries()
+        users = [
+            User.objects.create_user(username=f'user_{i}') for i in range(10)
+        ]
+        for user in users:
+            Post.objects.create(
+                author=self.author, text='Ещё', group=self.group
+            )
+            Comment.objects.create(author=user, post=self.post, text='Да')
+        self.assertEqual(self.count_queries(), small)
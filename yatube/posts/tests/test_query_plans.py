@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..views import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+from .utils import QueryPlanMixin
+
+User = get_user_model()
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    """Запросы лент и комментариев идут по индексам на любой странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Группа', slug='plans', description='Описание'
+        )
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(POSTS_PER_PAGE + 5):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+        cls.post = Post.objects.first()
+        for i in range(COMMENTS_PER_PAGE + 5):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def assertPagesIndexed(self, url):
+        """Первая и следующая страницы ``url`` читаются по индексам."""
+        with self.assertIndexedQueries(url):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertIsNotNone(next_cursor)
+        with self.assertIndexedQueries(f'{url} (вторая страница)'):
+            self.client.get(url, {'cursor': next_cursor})
+
+    def test_feeds(self):
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        ):
+            with self.subTest(url=url):
+                self.assertPagesIndexed(url)
+
+    def test_post_detail_and_comments(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with self.assertIndexedQueries(url):
+            response = self.client.get(url)
+        cursor = response.context['comments_page'].next_cursor
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        with self.assertIndexedQueries(url):
+            self.client.get(url, {'cursor': cursor})
+
+    def test_followers_of_author(self):
+        with self.assertIndexedQueries('подписчики автора'):
+            list(
+                Follow.objects.filter(author=self.author).values_list(
+                    'user_id', flat=True
+                )
+            )
+            Follow.objects.filter(
+                author=self.author, user=self.reader
+            ).exists()
@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from .. import search
+from ..search import search_ids, stem, tokenize
+
+User = get_user_model()
+
+
+class StemmerTests(SimpleTestCase):
+    def test_word_forms_share_stem(self):
+        forms = {
+            'котик': ('котики', 'котиками', 'котика'),
+            'книг': ('книга', 'книгами', 'книги'),
+            'прекрасн': ('прекрасный', 'прекраснейший'),
+        }
+        for expected, words in forms.items():
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+    def test_tokenize_keeps_latin_words(self):
+        self.assertEqual(
+            tokenize('Django и Котики!'), ['django', 'и', 'котик']
+        )
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Котики спят. Котик ест. Котики играют.'
+        )
+        cls.cat_and_dog = Post.objects.create(
+            author=cls.user, text='Котик дружит с собаками'
+        )
+        cls.dogs = Post.objects.create(author=cls.user, text='Про собаку')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_search_finds_word_forms_ranked_by_relevance(self):
+        response = self.guest_client.get(
+            reverse('posts:post_search'), {'q': 'котиками'}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), [self.cats, self.cat_and_dog]
+        )
+
+    def test_search_requires_all_words(self):
+        self.assertEqual(search_ids('котик собака'), [self.cat_and_dog.pk])
+        self.assertEqual(search_ids(''), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.dogs.text = 'Теперь про котиков'
+        self.dogs.save()
+        self.assertIn(self.dogs.pk, search_ids('котик'))
+        self.assertNotIn(self.dogs.pk, search_ids('собака'))
+        self.dogs.delete()
+        self.assertNotIn(self.dogs.pk, search_ids('котик'))
+
+    def test_truncated_results_are_announced(self):
+        url = reverse('posts:post_search')
+        response = self.guest_client.get(url, {'q': 'котик'})
+        self.assertFalse(response.context['truncated'])
+        with mock.patch.object(search, 'MAX_RESULTS', 1):
+            response = self.guest_client.get(url, {'q': 'котик'})
+        self.assertTrue(response.context['truncated'])
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertContains(response, 'уточните запрос')
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаками'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.cat_and_dog, self.dogs},
+        )
+        self.assertFalse(list(response.context['messages']))
+        with mock.patch.object(search, 'MAX_RESULTS', 1):
+            response = client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'собаками'}
+            )
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+        self.assertContains(response, 'уточните запрос')
+
+
+@override_settings(POST_SEARCH_BACKEND='inverted')
+class InvertedIndexSearchTests(SearchViewTests):
+    pass
@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from .. import counters
+from ..models import Comment, FeedEntry, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+@override_settings(FEED_LENGTH=5, FEED_FANOUT_LIMIT=6)
+class SeedDataTests(TestCase):
+    def seed(self, prefix='seed', **options):
+        call_command(
+            'seed_data',
+            prefix=prefix,
+            users=30,
+            groups=4,
+            posts=120,
+            comments=200,
+            follows=90,
+            batch=7,
+            stdout=StringIO(),
+            **options,
+        )
+
+    def snapshot(self):
+        return (
+            set(
+                UserCounters.objects.values_list(
+                    'user_id', 'posts_count', 'followers_count',
+                    'following_count',
+                )
+            ),
+            set(Group.objects.values_list('pk', 'posts_count')),
+            set(Post.objects.values_list('pk', 'comments_count')),
+        )
+
+    def test_creates_requested_amounts(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 4)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertEqual(Follow.objects.count(), 90)
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+
+    def test_counters_match_recount(self):
+        self.seed()
+        seeded = self.snapshot()
+        counters.recount()
+        self.assertEqual(seeded, self.snapshot())
+
+    def test_popularity_is_skewed(self):
+        self.seed(alpha=1.5)
+        posts = sorted(
+            UserCounters.objects.values_list('posts_count', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(posts[0], 4 * 120 / 30)
+
+    def test_dates_are_spread_and_comments_follow_posts(self):
+        self.seed()
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 100
+        )
+        self.assertFalse(
+            Comment.objects.filter(created__lt=F('post__pub_date')).exists()
+        )
+
+    def test_feeds_hold_latest_posts_of_pushed_authors(self):
+        self.seed()
+        for reader in User.objects.all():
+            expected = list(
+                Post.objects.filter(
+                    author__following__user=reader,
+                    author__counters__followers_count__lt=6,
+                ).values_list('pk', flat=True)[:5]
+            )
+            feed = list(
+                FeedEntry.objects.filter(user=reader)
+                .order_by('-pub_date', '-post_id')
+                .values_list('post_id', flat=True)
+            )
+            self.assertEqual(feed, expected, reader.username)
+
+    def test_same_seed_gives_same_dataset(self):
+        def shape(prefix):
+            return [
+                (
+                    user.username.split('_')[-1],
+                    user.counters.posts_count,
+                    user.counters.followers_count,
+                )
+                for user in User.objects.filter(
+                    username__startswith=f'{prefix}_'
+                ).select_related('counters').order_by('pk')
+            ]
+
+        self.seed('first', seed=1)
+        self.seed('second', seed=1)
+        self.assertEqual(shape('first'), shape('second'))
+
+    def test_existing_prefix_is_refused(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
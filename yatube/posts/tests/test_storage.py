@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post
+from ..storage import post_images
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def run_immediately(func):
+    func()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+@mock.patch.object(thumbnails.transaction, 'on_commit', run_immediately)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Незавершённые загрузки прошлых тестов не должны держать файлы
+        cache.clear()
+        post_images.uploaded_names().clear()
+
+    def create_post(self, name='small.gif', content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(name, content, 'image/gif'),
+        )
+
+    def age(self, name):
+        """Делает файл старше ORPHAN_MIN_AGE."""
+        week_ago = time.time() - 7 * 24 * 60 * 60
+        os.utime(post_images.path(name), (week_ago, week_ago))
+
+    def test_identical_images_are_stored_once(self):
+        first = self.create_post('cat.gif')
+        second = self.create_post('same_cat.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory), [
+            os.path.basename(first.image.name)
+        ])
+
+    def test_image_is_removed_with_last_reference(self):
+        first = self.create_post()
+        second = self.create_post()
+        name = first.image.name
+        thumbnails.generate(name)
+        self.age(name)
+        first.delete()
+        self.assertTrue(post_images.exists(name))
+        second.delete()
+        self.assertFalse(post_images.exists(name))
+        self.assertFalse(thumbnails.is_ready(name))
+
+    def test_replaced_image_is_released(self):
+        post = self.create_post()
+        old_name = post.image.name
+        self.age(old_name)
+        post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF + b'\x00', 'image/gif'
+        )
+        post.save()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(post_images.exists(old_name))
+
+    def test_fresh_image_is_removed_with_its_post(self):
+        post = self.create_post()
+        name = post.image.name
+        thumbnails.generate(name)
+        post.delete()
+        self.assertFalse(post_images.exists(name))
+        self.assertFalse(thumbnails.is_ready(name))
+
+    def test_image_reuploaded_before_commit_is_kept(self):
+        post = self.create_post()
+        name = post.image.name
+        self.age(name)
+        # Та же картинка загружена для поста, который ещё не зафиксирован
+        self.assertEqual(
+            post_images.save('posts/again.gif', ContentFile(SMALL_GIF)), name
+        )
+        post.delete()
+        self.assertTrue(post_images.exists(name))
+        Post.objects.create(author=self.user, text='Пост', image=name)
+        self.assertTrue(post_images.exists(name))
+
+    def test_dedupe_command_moves_legacy_files_and_drops_orphans(self):
+        legacy = FileSystemStorage()
+        first = legacy.save('posts/first.gif', ContentFile(SMALL_GIF))
+        second = legacy.save('posts/second.gif', ContentFile(SMALL_GIF))
+        orphan = legacy.save('posts/orphan.gif', ContentFile(SMALL_GIF))
+        week_ago = time.time() - 7 * 24 * 60 * 60
+        os.utime(legacy.path(orphan), (week_ago, week_ago))
+        for name in (first, second):
+            Post.objects.create(author=self.user, text='Старый', image=name)
+        call_command('dedupe_images', stdout=StringIO())
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertTrue(post_images.exists(names.pop()))
+        for name in (first, second, orphan):
+            with self.subTest(name=name):
+                self.assertFalse(legacy.exists(name))
+
+    def test_image_is_sanitized_only_once_after_upload(self):
+        with mock.patch.object(thumbnails.uploads, 'sanitize') as sanitize:
+            post = self.create_post()
+            self.create_post('same.gif')
+            default.kvstore.delete_thumbnails(
+                thumbnails.source(post.image.name)
+            )
+            cache.clear()
+            thumbnails.get_ready(
+                post.image, '960x339', crop='center', upscale=True
+            )
+        sanitize.assert_called_once_with(post.image.name)
+
+    def test_replace_swaps_file_without_deleting_it(self):
+        name = post_images.save('posts/small.gif', ContentFile(SMALL_GIF))
+        with mock.patch.object(post_images, 'delete') as delete:
+            post_images.replace(name, ContentFile(b'new'))
+        delete.assert_not_called()
+        with post_images.open(name) as file:
+            self.assertEqual(file.read(), b'new')
+        self.assertEqual(
+            os.listdir(os.path.dirname(post_images.path(name))),
+            [os.path.basename(name)],
+        )
@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_page_shows_placeholder_until_thumbnail_is_ready(self):
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            response = self.guest_client.get(
+                reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+            )
+        schedule.assert_called_once_with(self.post.image.name)
+        self.assertNotContains(response, self.post.image.url)
+        width, height = settings.POST_IMAGE_ASPECT
+        self.assertContains(response, f'aspect-ratio: {width} / {height}')
+
+    def test_generated_thumbnail_is_served(self):
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.get_ready(
+            self.post.image, '960x339', crop='center', upscale=True
+        )
+        self.assertIsNotNone(thumbnail)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, thumbnail.url)
+
+    def test_cached_pages_pick_up_thumbnails_when_ready(self):
+        with mock.patch.object(thumbnails, 'schedule'):
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'aspect-ratio')
+        thumbnails._run(self.post.image.name)
+        thumbnail = thumbnails.get_ready(
+            self.post.image, '960x339', crop='center', upscale=True
+        )
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_callback_thread_closes_its_connections(self):
+        closed = []
+        # Задача ждёт, пока колбэк не повешен, чтобы он выполнился в пуле
+        gate = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        with mock.patch.multiple(
+            thumbnails,
+            executor=mock.Mock(return_value=pool),
+            process=mock.Mock(side_effect=lambda *args: gate.wait()),
+            invalidate_pages=mock.DEFAULT,
+        ), mock.patch.object(
+            thumbnails.connections,
+            'close_all',
+            side_effect=lambda: closed.append(threading.get_ident()),
+        ):
+            thumbnails._run(self.post.image.name)
+            gate.set()
+            pool.shutdown()
+        self.assertEqual(len(closed), 1)
+        self.assertNotEqual(closed[0], threading.get_ident())
+
+    def test_cards_list_width_variants_in_srcset(self):
+        thumbnails.generate(self.post.image.name)
+        response = self.guest_client.get(reverse('posts:index'))
+        for width in settings.POST_IMAGE_WIDTHS:
+            with self.subTest(width=width):
+                self.assertContains(response, f' {width}w')
+        self.assertContains(response, f'sizes="{thumbnails.SIZES}"')
+
+    def test_variant_formats_follow_pillow_support(self):
+        with mock.patch.dict(Image.SAVE, {'WEBP': None}):
+            formats = {fmt for _, fmt, _, _ in thumbnails.variants()}
+        self.assertIn('WEBP', formats)
+        with mock.patch.dict(Image.SAVE):
+            Image.SAVE.pop('WEBP', None)
+            Image.SAVE.pop('AVIF', None)
+            formats = {fmt for _, fmt, _, _ in thumbnails.variants()}
+        self.assertEqual(formats, {'JPEG'})
+
+    def test_new_image_is_scheduled_once(self):
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit'
+        ) as on_commit:
+            thumbnails.schedule('posts/other.gif')
+            thumbnails.schedule('posts/other.gif')
+        self.assertEqual(on_commit.call_count, 1)
+
+    def test_warm_up_command_generates_and_then_skips(self):
+        output = StringIO()
+        call_command('warm_thumbnails', workers=0, stdout=output)
+        self.assertIn('Обработано 1 картинок', output.getvalue())
+        self.assertIsNotNone(
+            thumbnails.get_ready(
+                self.post.image, '960x339', crop='center', upscale=True
+            )
+        )
+        output = StringIO()
+        call_command('warm_thumbnails', workers=0, stdout=output)
+        self.assertIn('пропущено готовых 1', output.getvalue())
@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import uploads
+from ..models import Post
+from ..storage import post_images
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadValidationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, content=SMALL_GIF):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile('small.gif', content, 'image/gif'),
+            },
+        )
+
+    def assertRejected(self, response, code):
+        self.assertEqual(
+            response.context['form'].errors.as_data()['image'][0].code, code
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_valid_image_is_accepted(self):
+        self.create_post()
+        self.assertTrue(Post.objects.filter(image__endswith='.gif').exists())
+
+    @override_settings(UPLOAD_MAX_BYTES=16)
+    def test_oversize_upload_is_cut_off(self):
+        self.assertRejected(self.create_post(), 'file_too_large')
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1)
+    def test_too_many_pixels_are_rejected_by_header(self):
+        self.assertRejected(self.create_post(), 'too_many_pixels')
+
+    @override_settings(POST_IMAGE_FORMATS=('PNG',))
+    def test_unsupported_format_is_rejected(self):
+        self.assertRejected(self.create_post(), 'invalid_format')
+
+    def test_broken_image_is_rejected(self):
+        self.assertRejected(self.create_post(b'not an image'), 'invalid_image')
+
+    def test_handler_drops_data_past_limit(self):
+        handler = uploads.LimitedUploadHandler()
+        with override_settings(UPLOAD_MAX_BYTES=4):
+            handler.new_file('image', 'a.gif', 'image/gif', None)
+        self.assertEqual(handler.receive_data_chunk(b'abc', 0), b'abc')
+        self.assertIsNone(handler.receive_data_chunk(b'def', 3))
+        self.assertIsInstance(
+            handler.file_complete(6), uploads.RejectedUpload
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SanitizeTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_metadata_is_stripped_and_orientation_applied(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = BytesIO()
+        Image.new('RGB', (4, 2)).save(buffer, 'JPEG', exif=exif.tobytes())
+        name = post_images.save(
+            'posts/rotated.jpg', ContentFile(buffer.getvalue())
+        )
+        self.assertTrue(uploads.sanitize(name))
+        with post_images.open(name) as file, Image.open(file) as image:
+            self.assertEqual(image.size, (2, 4))
+            self.assertNotIn('exif', image.info)
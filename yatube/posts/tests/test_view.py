@@ -10,6 +10,7 @@ from django.shortcuts import get_object_or_404
 from django.test import Client, TestCase
 from django.urls import reverse
 
+from ..caching import invalidate, version_key
 from ..models import Follow, Group, Post
 
 User = get_user_model()
@@ -94,13 +95,105 @@ class TaskPagesTestsContext(TestCase):
 
     def test_cache_created_for_guest_client(self):
         response_first = self.guest_client.get(reverse('posts:index'))
-        Post.objects.all().delete()
+        Post.objects.all().update(text='Обновлено в обход сигналов')
         response_cached = self.guest_client.get(reverse('posts:index'))
         self.assertEqual(response_first.content, response_cached.content)
         cache.clear()
         response_uncached = self.guest_client.get(reverse('posts:index'))
         self.assertNotEqual(response_first.content, response_uncached.content)
 
+    def test_cache_invalidated_on_post_changes(self):
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                response_first = self.guest_client.get(page)
+                post = Post.objects.get(pk=self.post.pk)
+                post.text = f'Отредактированный пост для {page}'
+                post.save()
+                response_edited = self.guest_client.get(page)
+                self.assertNotEqual(
+                    response_first.content, response_edited.content
+                )
+                self.assertContains(response_edited, post.text)
+
+    def test_post_cards_are_cached_until_post_is_edited(self):
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо кеша')
+        invalidate('index')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.text)
+        self.assertNotContains(response, 'Мимо кеша')
+        post = Post.objects.get(pk=self.post.pk)
+        post.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Мимо кеша')
+
+    def test_post_cards_follow_group_and_author_renames(self):
+        self.guest_client.get(reverse('posts:index'))
+        Group.objects.filter(pk=self.group.pk).update(slug='renamed_slug')
+        User.objects.filter(pk=self.user.pk).update(first_name='Новое имя')
+        invalidate('index')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'renamed_slug')
+        self.assertContains(response, 'Новое имя')
+
+    def test_cache_invalidated_when_author_is_renamed(self):
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+        )
+        for page in pages:
+            self.guest_client.get(page)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Переименованный'
+        user.save()
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertContains(
+                    self.guest_client.get(page), 'Переименованный'
+                )
+
+    def test_cached_pages_are_revalidated_by_clients(self):
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+        for page in pages:
+            # Второй запрос отдаётся из кеша страниц
+            for response in (
+                self.guest_client.get(page), self.guest_client.get(page)
+            ):
+                with self.subTest(page=page):
+                    cache_control = response['Cache-Control']
+                    self.assertIn('no-cache', cache_control)
+                    self.assertIn('max-age=0', cache_control)
+                    self.assertNotIn('max-age=3600', cache_control)
+                    self.assertFalse(response.has_header('Expires'))
+
+    def test_version_keys_are_ascii(self):
+        key = version_key('profile:Пользователь с пробелом')
+        self.assertTrue(key.isascii())
+        self.assertNotIn(' ', key)
+
+    def test_cache_invalidated_on_post_delete(self):
+        response_first = self.guest_client.get(reverse('posts:index'))
+        Post.objects.all().delete()
+        response_deleted = self.guest_client.get(reverse('posts:index'))
+        self.assertNotEqual(response_first.content, response_deleted.content)
+
+    def test_cache_invalidated_when_post_leaves_group(self):
+        page = reverse('posts:group_list', kwargs={'slug': 'test_slug'})
+        self.guest_client.get(page)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = None
+        post.save()
+        response = self.guest_client.get(page)
+        self.assertNotIn(self.post, response.context['page_obj'])
+
     def test_image_in_context_post_detail(self):
         response = self.authorized_client.get(
             reverse('posts:post_detail', kwargs={'post_id': self.post.id})
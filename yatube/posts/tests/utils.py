@@ -0,0 +1,68 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверки числа SQL-запросов для ``TestCase``."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget, name=''):
+        """Падает, если блок выполнил больше ``budget`` запросов."""
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(
+                f'{name or "Блок"} выполнил {executed} запросов '
+                f'при бюджете {budget}:\n{queries}'
+            )
+
+
+# Чтение таблицы целиком: строка плана без «USING INDEX» и подобного
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+
+
+class QueryPlanMixin:
+    """Проверки планов SQL-запросов SQLite для ``TestCase``."""
+
+    @contextmanager
+    def assertIndexedQueries(self, name=''):
+        """Падает, если SELECT блока читает таблицу целиком или сортирует.
+
+        Для каждого запроса выполняется ``EXPLAIN QUERY PLAN``; полный
+        просмотр таблицы и сортировка во временном B-дереве означают, что
+        запросу не хватает подходящего индекса.
+        """
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN есть только в SQLite')
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            yield queries
+        problems = []
+        with connection.cursor() as cursor:
+            for sql, params in queries:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = [row[-1] for row in cursor.fetchall()]
+                if any(
+                    FULL_SCAN.match(step) or 'TEMP B-TREE' in step
+                    for step in plan
+                ):
+                    problems.append('\n  '.join([sql, *plan]))
+        if problems:
+            self.fail(
+                f'{name or "Блок"}: запросы без подходящего индекса:\n'
+                + '\n'.join(problems)
+            )
@@ -0,0 +1,286 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+Миниатюры всех геометрий из ``settings.POST_THUMBNAILS`` создаются в пуле
+процессов сразу после сохранения поста с картинкой, а шаблоны только
+спрашивают у хранилища sorl, готова ли миниатюра, и не декодируют
+картинку во время запроса. Перед этим только что загруженная картинка
+один раз перекодируется без метаданных. Брокер не нужен: пул живёт внутри
+воркера.
+
+Кроме них для ``srcset`` создаются варианты шириной
+``settings.POST_IMAGE_WIDTHS`` — в JPEG и в форматах из
+``settings.POST_IMAGE_VARIANT_FORMATS``, которые умеет сохранять Pillow.
+"""
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections, transaction
+from PIL import Image
+from sorl.thumbnail import default, delete
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import caching, uploads
+from .models import Post
+from .storage import post_images
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+    'AVIF': 'image/avif',
+}
+
+# sorl знает расширения только до WebP; AVIF появляется в Pillow с плагином.
+EXTENSIONS.setdefault('AVIF', 'avif')
+
+# Карточки занимают всю ширину узкого экрана и не шире 960px на широком.
+SIZES = '(max-width: 960px) 100vw, 960px'
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который только ищет готовые миниатюры."""
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+ready_backend = ReadyThumbnailBackend()
+
+
+def source(name):
+    """Картинка поста для sorl: ключ миниатюр зависит от хранилища."""
+    return ImageFile(name, post_images)
+
+
+def variant_formats():
+    """Дополнительные форматы вариантов, которые умеет сохранять Pillow."""
+    Image.init()
+    return [
+        image_format
+        for image_format in settings.POST_IMAGE_VARIANT_FORMATS
+        if image_format in Image.SAVE
+    ]
+
+
+def variants():
+    """Варианты для srcset: (ширина, формат, геометрия, параметры sorl)."""
+    aspect_width, aspect_height = settings.POST_IMAGE_ASPECT
+    for image_format in ('JPEG', *variant_formats()):
+        for width in sorted(settings.POST_IMAGE_WIDTHS):
+            height = round(width * aspect_height / aspect_width)
+            options = {'crop': 'center', 'upscale': True}
+            if image_format != 'JPEG':
+                options['format'] = image_format
+            yield width, image_format, f'{width}x{height}', options
+
+
+def geometries():
+    """Все геометрии, которые создаются для новой картинки."""
+    result = list(getattr(settings, 'POST_THUMBNAILS', ()))
+    for _, _, geometry, options in variants():
+        if (geometry, options) not in result:
+            result.append((geometry, options))
+    return result
+
+
+def get_ready(image, geometry, **options):
+    """Готовая миниатюра или None; недостающую ставит в очередь."""
+    if not image:
+        return None
+    thumbnail = ready_backend.get_ready_thumbnail(image, geometry, **options)
+    if thumbnail is None:
+        schedule(image.name)
+    return thumbnail
+
+
+def get_picture(image):
+    """Готовые варианты картинки для тега <picture> или None без картинки.
+
+    Недостающие варианты ставит в очередь. Пока не готов ни один вариант
+    в JPEG, возвращает только размеры для заглушки: оригинал может весить
+    в разы больше любой миниатюры.
+    """
+    if not image:
+        return None
+    srcsets = {}
+    ready = missing = 0
+    for width, image_format, geometry, options in variants():
+        thumbnail = ready_backend.get_ready_thumbnail(
+            image, geometry, **options
+        )
+        if thumbnail is None:
+            missing += 1
+            continue
+        ready += 1
+        srcsets.setdefault(image_format, []).append(
+            (thumbnail.url, width)
+        )
+    if missing:
+        schedule(image.name)
+    fallback = srcsets.pop('JPEG', None)
+    if not fallback:
+        width, height = settings.POST_IMAGE_ASPECT
+        return {'width': width, 'height': height, 'ready': ready}
+    return {
+        'src': fallback[-1][0],
+        'srcset': ', '.join(f'{url} {width}w' for url, width in fallback),
+        'sources': [
+            {
+                'type': MIME_TYPES.get(image_format, ''),
+                'srcset': ', '.join(f'{url} {width}w' for url, width in urls),
+            }
+            for image_format, urls in srcsets.items()
+        ],
+        'sizes': SIZES,
+        'ready': ready,
+    }
+
+
+def generate(name):
+    """Создаёт миниатюры всех геометрий для файла ``name``."""
+    for geometry, options in geometries():
+        default.backend.get_thumbnail(source(name), geometry, **options)
+    return name
+
+
+def is_ready(name):
+    """Готовы ли миниатюры всех геометрий для файла ``name``."""
+    return all(
+        ready_backend.get_ready_thumbnail(source(name), geometry, **options)
+        for geometry, options in geometries()
+    )
+
+
+def process(name, sanitize=False):
+    """Режет миниатюры картинки, а только что загруженную сначала чистит.
+
+    Перекодирование без метаданных теряет качество JPEG, поэтому
+    выполняется ровно один раз — для файла, который записала загрузка, —
+    и никогда при досоздании недостающих миниатюр из шаблона.
+    """
+    if sanitize:
+        uploads.sanitize(name)
+    elif is_ready(name):
+        return name
+    return generate(name)
+
+
+def setup_worker():
+    import django
+
+    django.setup()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=get_context('spawn'),
+            initializer=setup_worker,
+        )
+    return _executor
+
+
+def invalidate_pages(name):
+    """Сбрасывает страницы с постами, где вместо миниатюр был оригинал."""
+    posts = Post.objects.filter(image=name).values_list(
+        'author__username', 'group__slug'
+    )
+    scopes = {'index'}
+    for username, slug in posts:
+        scopes.add(f'profile:{username}')
+        if slug is not None:
+            scopes.add(f'group:{slug}')
+    caching.invalidate(*scopes)
+
+
+def _finish(name, error=None):
+    cache.delete(f'thumbnails:pending:{name}')
+    if error is not None:
+        logger.error('Не удалось создать миниатюры %s: %s', name, error)
+        return
+    invalidate_pages(name)
+
+
+def _run(name, sanitize=False):
+    if not settings.THUMBNAIL_WORKERS:
+        try:
+            process(name, sanitize)
+        except Exception as error:
+            _finish(name, error)
+        else:
+            _finish(name)
+        return
+    try:
+        future = executor().submit(process, name, sanitize)
+    except RuntimeError as error:
+        _finish(name, error)
+        return
+    submitter = threading.get_ident()
+
+    def finished(done):
+        try:
+            _finish(name, done.exception())
+        finally:
+            # Колбэк обычно выполняет служебный поток пула, где соединения
+            # с базой не закрывает ни один цикл запроса
+            if threading.get_ident() != submitter:
+                connections.close_all()
+
+    future.add_done_callback(finished)
+
+
+def _release(name):
+    if Post.objects.filter(image=name).exists():
+        return
+    # Те же байты могли загрузить заново для ещё не зафиксированного поста
+    if post_images.is_uploading(name):
+        return
+    try:
+        delete(source(name))
+    except (OSError, SuspiciousFileOperation) as error:
+        logger.error('Не удалось удалить картинку %s: %s', name, error)
+
+
+def release(name):
+    """Удаляет картинку с миниатюрами, когда на неё не ссылаются посты.
+
+    Файл, который сейчас загружают для ещё не зафиксированного поста, не
+    трогает.
+    """
+    if name:
+        transaction.on_commit(lambda: _release(name))
+
+
+def schedule(name, sanitize=False):
+    """Ставит генерацию миниатюр в очередь после фиксации транзакции.
+
+    ``sanitize`` — только для файла, который сейчас записала загрузка.
+    """
+    if not name:
+        return
+    pending = cache.add(f'thumbnails:pending:{name}', True, 60)
+    if pending or sanitize:
+        transaction.on_commit(lambda: _run(name, sanitize))
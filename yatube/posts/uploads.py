@@ -0,0 +1,132 @@
+"""Приём картинок постов.
+
+Загрузка пишется во временный файл по частям и обрывается, как только
+превысила ``settings.UPLOAD_MAX_BYTES``. Формат и размеры проверяются по
+заголовку файла, без декодирования пикселей. Перекодирование без
+метаданных (``sanitize``) выполняется уже после ответа, в пуле миниатюр.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image, ImageOps
+
+from .storage import post_images
+
+# Что переносится в перекодированный файл: цветовой профиль и
+# прозрачность нужны для отображения, остальное (EXIF, GPS, комментарии
+# и текстовые блоки PNG) отбрасывается.
+KEPT_INFO = ('icc_profile', 'transparency')
+
+
+def max_bytes():
+    return settings.UPLOAD_MAX_BYTES
+
+
+def file_too_large(limit):
+    return ValidationError(
+        'Картинка больше %(limit)s МБ.',
+        code='file_too_large',
+        params={'limit': limit // 2 ** 20},
+    )
+
+
+class RejectedUpload(UploadedFile):
+    """Загрузка, отброшенная из-за размера.
+
+    Данных в ней нет, поэтому попытка их прочитать (первое, что делает
+    ``forms.ImageField``) заканчивается ошибкой валидации.
+    """
+
+    def __init__(self, name, content_type, size, limit):
+        super().__init__(None, name, content_type, size)
+        self.limit = limit
+
+    def read(self, *args, **kwargs):
+        raise file_too_large(self.limit)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Перестаёт принимать файл, как только он превысил лимит.
+
+    Должен стоять в ``FILE_UPLOAD_HANDLERS`` первым: лишние части файла не
+    передаются следующим обработчикам и не попадают ни в память, ни на
+    диск, а вместо файла форма получает ``RejectedUpload``.
+    """
+
+    def new_file(self, field_name, file_name, content_type, content_length,
+                 *args, **kwargs):
+        super().new_file(
+            field_name, file_name, content_type, content_length,
+            *args, **kwargs
+        )
+        self.limit = max_bytes()
+        self.received = 0
+        self.rejected = (
+            content_length is not None and content_length > self.limit
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received = start + len(raw_data)
+        if self.received > self.limit:
+            self.rejected = True
+        return None if self.rejected else raw_data
+
+    def file_complete(self, file_size):
+        if self.rejected:
+            return RejectedUpload(
+                self.file_name, self.content_type, self.received, self.limit
+            )
+        return None
+
+
+def check_image(file):
+    """Валидатор поля картинки: размер файла, формат и число пикселей.
+
+    Формат и размеры берутся из заголовка, который уже разобрал
+    ``forms.ImageField`` (атрибут ``image``), пиксели не декодируются.
+    """
+    limit = max_bytes()
+    if file.size > limit:
+        raise file_too_large(limit)
+    image = getattr(file, 'image', None)
+    if image is None:
+        return
+    if image.format not in settings.POST_IMAGE_FORMATS:
+        raise ValidationError(
+            'Формат %(format)s не поддерживается.',
+            code='invalid_format',
+            params={'format': image.format},
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка %(width)s×%(height)s слишком большая.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+
+
+def sanitize(name):
+    """Перекодирует картинку ``name`` без метаданных.
+
+    Ориентация из EXIF применяется к пикселям. Анимированные картинки не
+    трогает. Возвращает True, если файл был перезаписан.
+    """
+    with post_images.open(name) as source:
+        image = Image.open(source)
+        if getattr(image, 'is_animated', False):
+            return False
+        image_format = image.format
+        clean = ImageOps.exif_transpose(image)
+        kept = {key: image.info[key] for key in KEPT_INFO if key in image.info}
+    clean.info = dict(kept)
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        kept.update(quality=90, optimize=True)
+    clean.save(buffer, image_format, **kept)
+    post_images.replace(name, ContentFile(buffer.getvalue()))
+    return True
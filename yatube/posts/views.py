@@ -1,27 +1,67 @@
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.exceptions import PermissionDenied
+from django.db.models import OuterRef, Subquery
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from core.replicas import read_from_replica
 
+from . import feeds, live, search
+from .caching import cache_versioned
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from .paginators import CachedCountPaginator, CursorPaginator
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+
+def live_options():
+    """Как страница ленты узнаёт о новых постах: поток событий или опрос."""
+    return {
+        'live_sse': settings.LIVE_SSE,
+        'live_interval': settings.LIVE_POLL_INTERVAL,
+    }
 
 
 def get_page(request, queryset):
-    paginator = Paginator(queryset, 10)
+    """Страница ленты по курсору или, для старых ссылок, по номеру.
+
+    Номер страницы стоит OFFSET, растущий с глубиной, поэтому номера
+    дальше ``PAGINATOR_MAX_PAGE`` отвечают 404 без запросов к базе.
+    """
+    max_pages = settings.PAGINATOR_MAX_PAGE
+    paginator = CursorPaginator(queryset, POSTS_PER_PAGE, max_pages=max_pages)
     page_number = request.GET.get('page')
+    if page_number is None:
+        return paginator.get_cursor_page(request.GET.get('cursor'))
+    if page_number.isdigit() and int(page_number) > max_pages:
+        raise Http404('Слишком далёкая страница')
     return paginator.get_page(page_number)
 
 
-@cache_page(20)
+@read_from_replica
+@cache_versioned('index')
 def index(request):
     posts = Post.objects.select_related('group', 'author')
     template = 'posts/index.html'
     page_obj = get_page(request, posts)
-    context = {'page_obj': page_obj, 'posts': posts}
+    context = {
+        'page_obj': page_obj,
+        'posts': posts,
+        **live_options(),
+    }
     return render(request, template, context)
 
 
+@read_from_replica
+@cache_versioned('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     posts = group.posts.select_related('group', 'author')
@@ -31,8 +71,12 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@read_from_replica
+@cache_versioned('profile:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username
+    )
     posts = author.posts.select_related('group', 'author')
     template = 'posts/profile.html'
     page_obj = get_page(request, posts)
@@ -48,20 +92,131 @@ def profile(request, username):
     return render(request, template, context)
 
 
+def get_comments_page(post_id, cursor=None):
+    """Порция комментариев поста по ключу ``(created, id)``."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    paginator = CursorPaginator(
+        comments, COMMENTS_PER_PAGE, key=('created', 'pk')
+    )
+    return paginator.get_cursor_page(cursor)
+
+
+def get_post(request, post_id):
+    """Пост для post_detail со временем последнего комментария.
+
+    Загружается один раз на запрос: его читают и валидаторы ``condition``,
+    и сама вьюха, поэтому ответ 304 стоит одного запроса к базе.
+    """
+    if not hasattr(request, '_post'):
+        last_comment = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by('-created')
+            .values('created')[:1]
+        )
+        request._post = (
+            Post.objects.select_related('group', 'author__counters')
+            .annotate(last_comment=Subquery(last_comment))
+            .filter(pk=post_id)
+            .first()
+        )
+    return request._post
+
+
+def post_last_modified(request, post_id):
+    post = get_post(request, post_id)
+    if post is None:
+        return None
+    return max(filter(None, (post.edited, post.last_comment)))
+
+
+def post_etag(request, post_id):
+    """ETag страницы поста.
+
+    Кроме правок поста и комментариев страница показывает имя автора и
+    группу, у которых нет своего времени изменения, поэтому валидатор
+    только ETag: по одному ``If-Modified-Since`` переименование осталось
+    бы незамеченным.
+    """
+    post = get_post(request, post_id)
+    if post is None:
+        return None
+    counters = getattr(post.author, 'counters', None)
+    group = post.group
+    source = ':'.join(
+        map(
+            str,
+            (
+                post_last_modified(request, post_id).timestamp(),
+                post.comments_count,
+                counters.posts_count if counters else 0,
+                post.author.username,
+                post.author.get_full_name(),
+                group.slug if group else '',
+                group.title if group else '',
+                request.user.pk,
+            ),
+        )
+    )
+    return '"{}"'.format(md5(source.encode()).hexdigest())
+
+
+@read_from_replica
+@vary_on_cookie
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
     form = CommentForm(request.GET)
-    concrete_post = get_object_or_404(Post, pk=post_id)
-    comments = concrete_post.comments.select_related('post')
+    concrete_post = get_post(request, post_id)
+    if concrete_post is None:
+        raise Http404('Пост не найден')
+    comments_page = get_comments_page(post_id)
 
     template = 'posts/post_detail.html'
     context = {
         'concrete_post': concrete_post,
         'form': form,
-        'comments': comments,
+        'comments': comments_page.object_list,
+        'comments_page': comments_page,
+    }
+    return render(request, template, context)
+
+
+def post_comments(request, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»."""
+    concrete_post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments_page = get_comments_page(post_id, request.GET.get('cursor'))
+    template = 'includes/comment_list.html'
+    context = {
+        'concrete_post': concrete_post,
+        'comments': comments_page.object_list,
+        'comments_page': comments_page,
     }
     return render(request, template, context)
 
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    ids = search.search_ids(query, search.MAX_RESULTS + 1)
+    truncated = len(ids) > search.MAX_RESULTS
+    paginator = CachedCountPaginator(
+        ids[:search.MAX_RESULTS], POSTS_PER_PAGE
+    )
+    page_obj = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.select_related('group', 'author').in_bulk(
+        list(page_obj)
+    )
+    page_obj.object_list = [posts[pk] for pk in page_obj if pk in posts]
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+        'truncated': truncated,
+        'max_results': search.MAX_RESULTS,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -80,7 +235,7 @@ def post_create(request):
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
     edit_post = get_object_or_404(Post, id=post_id)
-    if request.user != edit_post.author:
+    if request.user.pk != edit_post.author_id:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
         request.POST or None,
@@ -106,15 +261,74 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@read_from_replica
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page(request, posts)
-    context = {'page_obj': page_obj, 'title': 'Избранные записи'}
+    paginator = feeds.follow_paginator(request.user, POSTS_PER_PAGE)
+    page_obj = paginator.get_cursor_page(request.GET.get('cursor'))
+    context = {
+        'page_obj': page_obj,
+        'title': 'Избранные записи',
+        **live_options(),
+    }
     return render(request, template, context)
 
 
+def live_params(request):
+    """Лента и id последнего показанного поста из запроса."""
+    feed = request.GET.get('feed', 'index')
+    if feed not in live.FEEDS:
+        raise Http404('Неизвестная лента')
+    if feed == 'follow' and not request.user.is_authenticated:
+        raise PermissionDenied
+    after = request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('after')
+    if after is None or not after.isdigit():
+        return feed, live.last_post_id()
+    return feed, int(after)
+
+
+def live_events(request):
+    """Поток Server-Sent Events с id новых постов ленты.
+
+    Поток держит поток сервера до ``LIVE_STREAM_TIMEOUT``, поэтому включён
+    только под ASGI (``LIVE_SSE``); иначе лента опрашивает ``live_poll``.
+    """
+    if not settings.LIVE_SSE:
+        raise Http404('Поток событий выключен')
+    feed, after = live_params(request)
+    response = StreamingHttpResponse(
+        live.stream(request.user, feed, after),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx иначе копит ответ в буфере и события приходят пачками
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def live_poll(request):
+    """id новых постов ленты для опроса без удержания соединения."""
+    feed, after = live_params(request)
+    latest, ids = live.poll(request.user, feed, after)
+    response = JsonResponse({'latest': latest, 'posts': ids})
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def live_posts(request):
+    """Карточки постов новее ``?after=`` для кнопки «Новые записи»."""
+    feed, after = live_params(request)
+    posts = list(
+        live.new_posts(request.user, feed, after).select_related(
+            'group', 'author'
+        )[:settings.LIVE_MAX_POSTS]
+    )
+    response = render(request, 'includes/live_posts.html', {'posts': posts})
+    response['X-Latest-Post'] = max((post.pk for post in posts), default=after)
+    return response
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -0,0 +1,17 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI support of its own, so the callable is the adapter
+from ``core.asgi``, e.g. ``uvicorn yatube.asgi:application``.
+"""
+
+import os
+
+from core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+# Потоковые ответы здесь идут в отдельном пуле и не занимают воркеры
+os.environ.setdefault('YATUBE_LIVE_SSE', '1')
+
+application = get_asgi_application()
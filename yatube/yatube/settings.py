@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from core.database import database_from_url, replicas_from_urls
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -48,6 +50,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
@@ -57,6 +60,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.replicas.StickyPrimaryMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
@@ -75,6 +79,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.page_cache.page_cache',
             ],
         },
     },
@@ -86,11 +91,48 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# YATUBE_DB_URL — адрес базы (sqlite:///путь или postgres://...),
+# YATUBE_DB_CONN_MAX_AGE — сколько секунд держать соединение потока открытым
+# (0 — закрывать после каждого запроса), YATUBE_DB_HEALTH_CHECKS=0 отключает
+# проверку постоянного соединения в начале запроса
+DB_CONN_MAX_AGE = int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 60))
+DB_HEALTH_CHECKS = os.environ.get('YATUBE_DB_HEALTH_CHECKS', '1') == '1'
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    'default': database_from_url(
+        os.environ.get(
+            'YATUBE_DB_URL',
+            'sqlite:///' + os.path.join(BASE_DIR, 'db.sqlite3'),
+        ),
+        conn_max_age=DB_CONN_MAX_AGE,
+        health_checks=DB_HEALTH_CHECKS,
+    ),
+}
+
+# YATUBE_DB_REPLICA_URLS — адреса реплик через запятую. Ленты читаются с
+# реплик (core.replicas); REPLICA_MAX_LAG — допустимое отставание реплики:
+# столько автор после записи читает из default и столько живут в кеше
+# страницы, собранные по реплике. Локально реплики — копии файла SQLite,
+# которые обновляет команда replicate_sqlite
+DATABASES.update(
+    replicas_from_urls(
+        os.environ.get('YATUBE_DB_REPLICA_URLS', ''),
+        conn_max_age=DB_CONN_MAX_AGE,
+        health_checks=DB_HEALTH_CHECKS,
+    )
+)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_MAX_LAG = 10
+
+# Применяются к каждому новому соединению SQLite: журнал WAL позволяет
+# читать во время записи, NORMAL не ждёт fsync на каждой фиксации (в WAL
+# это безопасно для целостности), busy_timeout ждёт занятую базу вместо
+# ошибки, mmap читает файл базы через отображение в память
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
 }
 
 
@@ -148,13 +190,93 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# YATUBE_CACHE=sqlite включает кеш в файле, общий для всех воркеров
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
+}
+
+# Страницы лент сбрасываются сигналами, поэтому могут жить долго
+PAGE_CACHE_TIMEOUT = 60 * 60
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
- 
\ No newline at end of file
+ 
+# Сколько последних записей хранится в ленте подписок одного пользователя
+FEED_LENGTH = 1000
+# Авторы с таким числом подписчиков не раскладываются по лентам, а читаются
+# при запросе ленты; множество таких авторов кешируется на указанное время.
+# Обратно в ленты автор возвращается, только когда подписчиков стало меньше
+# FEED_PUSH_RATIO от порога. Переключает авторов команда rebalance_feeds,
+# которую запускают по расписанию
+FEED_FANOUT_LIMIT = 5000
+FEED_PUSH_RATIO = 0.8
+FEED_PULL_CACHE_TTL = 300
+
+# Миниатюры картинок постов, которые используют шаблоны; создаются в пуле
+# из THUMBNAIL_WORKERS процессов (0 — сразу в процессе веб-сервера)
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+THUMBNAIL_WORKERS = 2
+
+# Индекс полнотекстового поиска: auto — FTS5, если SQLite собран с ним,
+# иначе обратный индекс в таблице SearchTerm; fts5 или inverted — явно
+POST_SEARCH_BACKEND = 'auto'
+
+# Загрузки крупнее FILE_UPLOAD_MAX_MEMORY_SIZE пишутся во временный файл по
+# частям; файл больше UPLOAD_MAX_BYTES обрывается на первом лишнем блоке
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+# Допустимые картинки постов; проверяются по заголовку файла
+POST_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+POST_IMAGE_MAX_PIXELS = 25_000_000
+
+# Адаптивные варианты картинки поста для srcset: ширины в пропорциях
+# миниатюры POST_IMAGE_ASPECT; кроме JPEG — форматы из списка, которые
+# умеет сохранять установленный Pillow
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_ASPECT = (960, 339)
+POST_IMAGE_VARIANT_FORMATS = ('AVIF', 'WEBP')
+
+# Число записей для нумерованных страниц кешируется на PAGINATOR_COUNT_TTL
+# секунд; таблицы больше PAGINATOR_ESTIMATE_ABOVE строк без фильтров
+# считаются по статистике базы вместо COUNT(*)
+PAGINATOR_COUNT_TTL = 60
+PAGINATOR_ESTIMATE_ABOVE = 100_000
+# Глубже этой страницы лента по номеру (?page=) не листается: OFFSET растёт
+# с номером, а дальше ведут курсоры
+PAGINATOR_MAX_PAGE = 50
+
+# Живые ленты: поток событий о новых постах (LIVE_SSE) держит поток сервера
+# на всё соединение, поэтому включается только под ASGI (yatube/asgi.py),
+# а под WSGI страница опрашивает сервер раз в LIVE_POLL_INTERVAL секунд.
+# Поток сверяется с другими процессами с тем же интервалом и закрывается
+# через LIVE_STREAM_TIMEOUT, после чего браузер переподключается; за раз
+# подгружается не больше LIVE_MAX_POSTS новых постов
+LIVE_SSE = os.environ.get('YATUBE_LIVE_SSE', '') == '1'
+LIVE_POLL_INTERVAL = 5
+LIVE_STREAM_TIMEOUT = 5 * 60
+LIVE_MAX_POSTS = 50
+
+# Развёртывание через ASGI (yatube/asgi.py): потоки, в которых Django
+# строит ответы, и отдельные потоки для потоковых ответов живой ленты
+ASGI_THREADS = 8
+ASGI_STREAM_THREADS = 64